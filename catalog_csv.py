@@ -0,0 +1,85 @@
+"""
+Lectura de los CSV del catálogo de productos.
+
+Unifica los dos formatos que circulan en el proyecto:
+    - La salida del scraper (``productos_senasa_*.csv``): UTF-8 con BOM y
+      columnas ``numero_registro;marca;activos;banda_tox;aptitudes;presentacion``.
+    - El vademécum exportado (``Vademecum_Senasa.csv``): UTF-16 y columnas
+      ``NUM. REG.;MARCA;ACTIVOS;BANDA TOX;APTITUDES;FORMULACION;...``.
+
+Cada fila se devuelve con las claves de ``PRODUCT_FIELDS`` (los campos de
+``ProductRecord`` en ``scrape_senasa.py``).
+"""
+
+from __future__ import annotations
+
+import csv
+import re
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+PRODUCT_FIELDS = (
+    "numero_registro",
+    "marca",
+    "activos",
+    "banda_tox",
+    "aptitudes",
+    "presentacion",
+)
+
+HEADER_ALIASES: Dict[str, str] = {
+    "numeroregistro": "numero_registro",
+    "numreg": "numero_registro",
+    "numero": "numero_registro",
+    "registro": "numero_registro",
+    "marca": "marca",
+    "activos": "activos",
+    "bandatox": "banda_tox",
+    "aptitudes": "aptitudes",
+    "presentacion": "presentacion",
+    "formulacion": "presentacion",
+}
+
+
+def strip_accents(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text)
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def _header_key(header: str) -> str:
+    return re.sub(r"[^a-z0-9]", "", strip_accents(header or "").lower())
+
+
+def detect_encoding(path: Path) -> str:
+    with path.open("rb") as handle:
+        head = handle.read(4)
+    if head.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return "utf-16"
+    return "utf-8-sig"
+
+
+def iter_product_rows(path: Path) -> Iterator[Dict[str, str]]:
+    """Recorre un CSV del catálogo devolviendo filas con los campos normalizados."""
+    with path.open("r", encoding=detect_encoding(path), newline="") as csv_file:
+        reader = csv.reader(csv_file, delimiter=";")
+        header = next(reader, None)
+        if not header:
+            return
+        columns: Dict[int, str] = {}
+        for position, name in enumerate(header):
+            field: Optional[str] = HEADER_ALIASES.get(_header_key(name))
+            if field and field not in columns.values():
+                columns[position] = field
+        if "numero_registro" not in columns.values():
+            raise ValueError(f"{path} no tiene columna de número de registro")
+
+        for values in reader:
+            if not values:
+                continue
+            row = {field: "" for field in PRODUCT_FIELDS}
+            for position, field in columns.items():
+                if position < len(values):
+                    row[field] = values[position].strip()
+            if row["numero_registro"]:
+                yield row
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+Índice de búsqueda local (SQLite FTS5) sobre el catálogo de productos y la
+documentación del proyecto.
+
+Características principales:
+    - Indexa los CSV del catálogo (salida del scraper y vademécum) y los textos
+      convertidos por ``read_docx.py`` (usando su ``.offsets.jsonl`` si existe).
+    - Actualización incremental: sólo se reindexan las fuentes cuyo tamaño,
+      fecha o hash cambiaron.
+    - Búsqueda por prefijo, sin distinguir acentos ni mayúsculas y acotada por
+      campo (``marca:glifo activos:atrazina``).
+
+Uso:
+    python catalog_index.py indexar [FUENTES...]
+    python catalog_index.py buscar "activos:glifosato marca:round"
+    python catalog_index.py buscar --docs "plan de trabajo"
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from catalog_csv import PRODUCT_FIELDS, iter_product_rows
+
+DEFAULT_DATABASE = Path("catalogo.sqlite")
+DEFAULT_SOURCES = (
+    "productos_senasa_seguro.csv",
+    "productos_senasa_nuevos.csv",
+    "app/src/main/assets/Vademecum_Senasa.csv",
+    "Documentacion.txt",
+)
+TOKENIZER = "unicode61 remove_diacritics 2"
+
+# Alias aceptados en las búsquedas por campo.
+FIELD_ALIASES: Dict[str, str] = {
+    "registro": "numero_registro",
+    "numero": "numero_registro",
+    "numero_registro": "numero_registro",
+    "marca": "marca",
+    "activo": "activos",
+    "activos": "activos",
+    "banda": "banda_tox",
+    "banda_tox": "banda_tox",
+    "aptitud": "aptitudes",
+    "aptitudes": "aptitudes",
+    "presentacion": "presentacion",
+    "formulacion": "presentacion",
+}
+
+SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS fuentes (
+    ruta TEXT PRIMARY KEY,
+    tamano INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    hash TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS productos (
+    numero_registro TEXT PRIMARY KEY,
+    marca TEXT NOT NULL DEFAULT '',
+    activos TEXT NOT NULL DEFAULT '',
+    banda_tox TEXT NOT NULL DEFAULT '',
+    aptitudes TEXT NOT NULL DEFAULT '',
+    presentacion TEXT NOT NULL DEFAULT '',
+    fuente TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS productos_fuente ON productos (fuente);
+CREATE TABLE IF NOT EXISTS producto_fuentes (
+    fuente TEXT NOT NULL,
+    numero_registro TEXT NOT NULL,
+    marca TEXT NOT NULL DEFAULT '',
+    activos TEXT NOT NULL DEFAULT '',
+    banda_tox TEXT NOT NULL DEFAULT '',
+    aptitudes TEXT NOT NULL DEFAULT '',
+    presentacion TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (fuente, numero_registro)
+);
+CREATE INDEX IF NOT EXISTS producto_fuentes_registro ON producto_fuentes (numero_registro);
+CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+    {", ".join(PRODUCT_FIELDS)},
+    content='productos',
+    tokenize='{TOKENIZER}',
+    prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS productos_ai AFTER INSERT ON productos BEGIN
+    INSERT INTO productos_fts (rowid, {", ".join(PRODUCT_FIELDS)})
+    VALUES (new.rowid, {", ".join(f"new.{field}" for field in PRODUCT_FIELDS)});
+END;
+CREATE TRIGGER IF NOT EXISTS productos_ad AFTER DELETE ON productos BEGIN
+    INSERT INTO productos_fts (productos_fts, rowid, {", ".join(PRODUCT_FIELDS)})
+    VALUES ('delete', old.rowid, {", ".join(f"old.{field}" for field in PRODUCT_FIELDS)});
+END;
+CREATE TRIGGER IF NOT EXISTS productos_au AFTER UPDATE ON productos BEGIN
+    INSERT INTO productos_fts (productos_fts, rowid, {", ".join(PRODUCT_FIELDS)})
+    VALUES ('delete', old.rowid, {", ".join(f"old.{field}" for field in PRODUCT_FIELDS)});
+    INSERT INTO productos_fts (rowid, {", ".join(PRODUCT_FIELDS)})
+    VALUES (new.rowid, {", ".join(f"new.{field}" for field in PRODUCT_FIELDS)});
+END;
+CREATE TABLE IF NOT EXISTS documentos (
+    id INTEGER PRIMARY KEY,
+    fuente TEXT NOT NULL,
+    parte TEXT NOT NULL,
+    tipo TEXT NOT NULL,
+    inicio INTEGER NOT NULL,
+    texto TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS documentos_fuente ON documentos (fuente);
+CREATE VIRTUAL TABLE IF NOT EXISTS documentos_fts USING fts5(
+    texto,
+    content='documentos',
+    content_rowid='id',
+    tokenize='{TOKENIZER}',
+    prefix='2 3'
+);
+CREATE TRIGGER IF NOT EXISTS documentos_ai AFTER INSERT ON documentos BEGIN
+    INSERT INTO documentos_fts (rowid, texto) VALUES (new.id, new.texto);
+END;
+CREATE TRIGGER IF NOT EXISTS documentos_ad AFTER DELETE ON documentos BEGIN
+    INSERT INTO documentos_fts (documentos_fts, rowid, texto) VALUES ('delete', old.id, old.texto);
+END;
+"""
+
+
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_text_blocks(path: Path) -> Iterator[Tuple[str, str, int, str]]:
+    """Devuelve ``(parte, tipo, offset, texto)`` para cada bloque de un .txt.
+
+    Usa el ``.offsets.jsonl`` generado por ``read_docx.py``; si no existe,
+    toma cada línea no vacía como un párrafo.
+    """
+    text = path.read_text(encoding="utf-8")
+    offsets_path = path.with_suffix(".offsets.jsonl")
+    if offsets_path.exists():
+        with offsets_path.open("r", encoding="utf-8") as handle:
+            for line in handle:
+                if not line.strip():
+                    continue
+                block = json.loads(line)
+                start = block["offset"]
+                yield block["parte"], block["tipo"], start, text[start:start + block["longitud"]]
+        return
+
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        if line.strip():
+            yield "documento", "parrafo", offset, line.rstrip("\r\n")
+        offset += len(line)
+
+
+def build_match_query(query: str) -> str:
+    """Traduce la búsqueda del usuario a una expresión MATCH de FTS5.
+
+    Cada palabra se busca como prefijo; ``campo:valor`` restringe la palabra a
+    ese campo. Todas las palabras deben aparecer (AND).
+    """
+    terms: List[str] = []
+    for chunk in query.split():
+        field: Optional[str] = None
+        if ":" in chunk:
+            name, chunk = chunk.split(":", 1)
+            field = FIELD_ALIASES.get(name.lower())
+            if field is None:
+                raise ValueError(f"Campo desconocido: {name}")
+        for word in re.findall(r"\w+", chunk):
+            phrase = f'"{word}"*'
+            terms.append(f"{field} : {phrase}" if field else phrase)
+    return " AND ".join(terms)
+
+
+class CatalogIndex:
+    def __init__(self, path: Path = DEFAULT_DATABASE) -> None:
+        self.path = path
+        self.connection = sqlite3.connect(str(path))
+        self.connection.row_factory = sqlite3.Row
+        self.connection.executescript(SCHEMA)
+        self._seed_product_sources()
+
+    def _seed_product_sources(self) -> None:
+        """Completa ``producto_fuentes`` en bases creadas antes de que existiera."""
+        with self.connection:
+            if self.connection.execute("SELECT 1 FROM producto_fuentes LIMIT 1").fetchone():
+                return
+            columns = ", ".join(PRODUCT_FIELDS)
+            self.connection.execute(
+                f"INSERT INTO producto_fuentes (fuente, {columns}) SELECT fuente, {columns} FROM productos"
+            )
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def __enter__(self) -> "CatalogIndex":
+        return self
+
+    def __exit__(self, exc_type, exc, exc_tb) -> None:
+        self.close()
+
+    # --------------------------------------------------------------------- #
+    # Indexación
+    # --------------------------------------------------------------------- #
+    def index_file(self, path: Path, force: bool = False) -> bool:
+        """Indexa una fuente si cambió desde la última vez. Devuelve True si la reindexó."""
+        key = str(path.resolve())
+        stat = path.stat()
+        previous = self.connection.execute(
+            "SELECT tamano, mtime, hash FROM fuentes WHERE ruta = ?", (key,)
+        ).fetchone()
+        if not force and previous and previous["tamano"] == stat.st_size and previous["mtime"] == stat.st_mtime:
+            return False
+
+        digest = file_hash(path)
+        with self.connection:
+            if force or not previous or previous["hash"] != digest:
+                if path.suffix.lower() == ".csv":
+                    self._index_products(key, iter_product_rows(path))
+                else:
+                    self._index_document(key, path)
+                changed = True
+            else:
+                changed = False
+            self.connection.execute(
+                "INSERT INTO fuentes (ruta, tamano, mtime, hash) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (ruta) DO UPDATE SET tamano = excluded.tamano, "
+                "mtime = excluded.mtime, hash = excluded.hash",
+                (key, stat.st_size, stat.st_mtime, digest),
+            )
+        return changed
+
+    def _index_products(self, source: str, rows: Iterable[Dict[str, str]]) -> None:
+        """Reemplaza lo que aporta ``source`` y reconcilia la tabla ``productos``.
+
+        ``producto_fuentes`` guarda qué fuentes listan cada registro. Un
+        producto que esta fuente dejó de listar se toma de otra fuente que lo
+        siga listando y sólo se borra si ninguna lo hace.
+        """
+        columns = ", ".join(PRODUCT_FIELDS)
+        placeholders = ", ".join("?" * len(PRODUCT_FIELDS))
+        updates = ", ".join(f"{field} = excluded.{field}" for field in PRODUCT_FIELDS[1:])
+        self.connection.execute("DELETE FROM producto_fuentes WHERE fuente = ?", (source,))
+        for row in rows:
+            values = tuple(row[field] for field in PRODUCT_FIELDS)
+            self.connection.execute(
+                f"INSERT OR REPLACE INTO producto_fuentes (fuente, {columns}) VALUES (?, {placeholders})",
+                (source, *values),
+            )
+            self.connection.execute(
+                f"INSERT INTO productos ({columns}, fuente) VALUES ({placeholders}, ?) "
+                f"ON CONFLICT (numero_registro) DO UPDATE SET {updates}, fuente = excluded.fuente "
+                f"WHERE ({', '.join(PRODUCT_FIELDS[1:])}, fuente) IS NOT "
+                f"({', '.join(f'excluded.{field}' for field in PRODUCT_FIELDS[1:])}, excluded.fuente)",
+                (*values, source),
+            )
+
+        # Productos tomados de esta fuente que ya no figuran en ella.
+        orphaned = self.connection.execute(
+            "SELECT numero_registro FROM productos p WHERE fuente = ? AND NOT EXISTS ("
+            "SELECT 1 FROM producto_fuentes f WHERE f.fuente = p.fuente AND f.numero_registro = p.numero_registro)",
+            (source,),
+        ).fetchall()
+        for (registro,) in orphaned:
+            remaining = self.connection.execute(
+                f"SELECT fuente, {columns} FROM producto_fuentes WHERE numero_registro = ? "
+                "ORDER BY rowid DESC LIMIT 1",
+                (registro,),
+            ).fetchone()
+            if remaining is None:
+                self.connection.execute("DELETE FROM productos WHERE numero_registro = ?", (registro,))
+            else:
+                self.connection.execute(
+                    f"UPDATE productos SET {', '.join(f'{field} = ?' for field in PRODUCT_FIELDS[1:])}, fuente = ? "
+                    "WHERE numero_registro = ?",
+                    (*(remaining[field] for field in PRODUCT_FIELDS[1:]), remaining["fuente"], registro),
+                )
+
+    def _index_document(self, source: str, path: Path) -> None:
+        self.connection.execute("DELETE FROM documentos WHERE fuente = ?", (source,))
+        self.connection.executemany(
+            "INSERT INTO documentos (fuente, parte, tipo, inicio, texto) VALUES (?, ?, ?, ?, ?)",
+            ((source, part, kind, offset, text) for part, kind, offset, text in iter_text_blocks(path)),
+        )
+
+    # --------------------------------------------------------------------- #
+    # Búsqueda
+    # --------------------------------------------------------------------- #
+    def search_products(self, query: str, limit: int = 20) -> List[sqlite3.Row]:
+        match = build_match_query(query)
+        if not match:
+            return []
+        return self.connection.execute(
+            f"SELECT {', '.join(f'p.{field}' for field in PRODUCT_FIELDS)} "
+            "FROM productos_fts JOIN productos p ON p.rowid = productos_fts.rowid "
+            "WHERE productos_fts MATCH ? ORDER BY bm25(productos_fts) LIMIT ?",
+            (match, limit),
+        ).fetchall()
+
+    def search_documents(self, query: str, limit: int = 20) -> List[sqlite3.Row]:
+        match = build_match_query(query)
+        if not match:
+            return []
+        return self.connection.execute(
+            "SELECT d.fuente, d.parte, d.tipo, d.inicio, "
+            "snippet(documentos_fts, 0, '[', ']', '...', 16) AS fragmento "
+            "FROM documentos_fts JOIN documentos d ON d.id = documentos_fts.rowid "
+            "WHERE documentos_fts MATCH ? ORDER BY bm25(documentos_fts) LIMIT ?",
+            (match, limit),
+        ).fetchall()
+
+
+# ------------------------------------------------------------------------- #
+# CLI
+# ------------------------------------------------------------------------- #
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Índice de búsqueda del catálogo y la documentación.")
+    parser.add_argument(
+        "--db",
+        type=Path,
+        default=DEFAULT_DATABASE,
+        help="Base SQLite del índice (por defecto: %(default)s).",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    index_parser = subparsers.add_parser("indexar", help="Actualiza el índice con las fuentes indicadas.")
+    index_parser.add_argument(
+        "fuentes",
+        nargs="*",
+        type=Path,
+        help="CSV del catálogo o .txt de documentación (por defecto: las fuentes conocidas del proyecto).",
+    )
+    index_parser.add_argument("--forzar", action="store_true", help="Reindexa aunque no haya cambios.")
+
+    search_parser = subparsers.add_parser("buscar", help="Busca productos o documentación.")
+    search_parser.add_argument("consulta", help="Palabras a buscar; admite campo:valor.")
+    search_parser.add_argument("--docs", action="store_true", help="Busca en la documentación en lugar del catálogo.")
+    search_parser.add_argument("--limite", type=int, default=20, help="Máximo de resultados.")
+    search_parser.add_argument("--json", action="store_true", help="Imprime los resultados como JSON.")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+
+    with CatalogIndex(args.db) as index:
+        if args.command == "indexar":
+            sources = args.fuentes or [Path(source) for source in DEFAULT_SOURCES if os.path.exists(source)]
+            for source in sources:
+                if not source.exists():
+                    print(f"[!] No existe {source}")
+                    continue
+                start = time.perf_counter()
+                changed = index.index_file(source, force=args.forzar)
+                elapsed = (time.perf_counter() - start) * 1000
+                status = "indexado" if changed else "sin cambios"
+                print(f"[i] {source}: {status} ({elapsed:.0f} ms)")
+            return
+
+        start = time.perf_counter()
+        try:
+            if args.docs:
+                results = index.search_documents(args.consulta, args.limite)
+            else:
+                results = index.search_products(args.consulta, args.limite)
+        except (ValueError, sqlite3.OperationalError) as exc:
+            raise SystemExit(f"Consulta inválida: {exc}")
+        elapsed = (time.perf_counter() - start) * 1000
+
+    if args.json:
+        print(json.dumps([dict(row) for row in results], ensure_ascii=False, indent=2))
+        return
+
+    for row in results:
+        if args.docs:
+            print(f"{Path(row['fuente']).name} [{row['parte']} @{row['inicio']}] {row['fragmento']}")
+        else:
+            print(" | ".join(row[field] for field in PRODUCT_FIELDS))
+    print(f"[i] {len(results)} resultado(s) en {elapsed:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
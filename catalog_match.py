@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Detección de productos probablemente duplicados entre el scraping y el catálogo.
+
+La deduplicación del scraper sólo compara ``numero_registro``; un producto
+re-registrado o renumerado con la misma marca y los mismos activos aparece
+como nuevo. Este módulo compara por contenido sin recorrer todos los pares:
+
+    - Normaliza marca y activos (sin acentos, mayúsculas, concentraciones con
+      punto decimal) y compara las marcas sin las palabras del activo.
+    - Indexa trigramas de la marca, la marca exacta y la firma de principios
+      activos en índices invertidos (blocking); sólo se puntúan los pares que
+      comparten bloques. Los bloques de activos muy comunes (glifosato, 2,4-D)
+      se parten por concentración en lugar de descartarse.
+    - Puntúa cada par candidato combinando la similitud de la marca y la de
+      los activos, y reporta los que superan el umbral.
+
+Uso:
+    python catalog_match.py --nuevos productos_senasa_nuevos.csv --catalogo productos_senasa_seguro.csv
+    python catalog_match.py --catalogo app/src/main/assets/Vademecum_Senasa.csv   # duplicados internos
+    python catalog_match.py --catalogo app/src/main/assets/Vademecum_Senasa.csv --verificar
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import re
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from catalog_csv import iter_product_rows, strip_accents
+
+DEFAULT_THRESHOLD = 0.85
+MAX_BLOCK_SIZE = 150
+MARCA_WEIGHT = 0.6
+ACTIVOS_WEIGHT = 0.4
+
+INGREDIENT_SEPARATOR = re.compile(r",\s+|\s*\+\s*")
+CONCENTRATION = re.compile(r"(\d+(?:[.,]\d+)?|[.,]\d+)\s*%")
+
+REPORT_FIELDS = [
+    "score",
+    "sim_marca",
+    "sim_activos",
+    "registro_nuevo",
+    "marca_nuevo",
+    "activos_nuevo",
+    "registro_existente",
+    "marca_existente",
+    "activos_existente",
+]
+
+
+def normalize_text(text: str) -> str:
+    cleaned = re.sub(r"[^A-Z0-9]+", " ", strip_accents(text or "").upper())
+    return cleaned.strip()
+
+
+def parse_activos(text: str) -> Tuple[FrozenSet[str], FrozenSet[Tuple[str, str]]]:
+    """Devuelve los nombres de los principios activos y los pares (nombre, concentración)."""
+    names: Set[str] = set()
+    pairs: Set[Tuple[str, str]] = set()
+    for part in INGREDIENT_SEPARATOR.split(text or ""):
+        match = CONCENTRATION.search(part)
+        name = normalize_text(part[:match.start()] if match else part)
+        if not name:
+            continue
+        names.add(name)
+        if match:
+            concentration = match.group(1).replace(",", ".").rstrip("0").rstrip(".")
+            pairs.add((name, concentration))
+    return frozenset(names), frozenset(pairs)
+
+
+def trigrams(text: str) -> Set[str]:
+    grams: Set[str] = set()
+    for token in text.split():
+        padded = f" {token} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def brand_core(marca: str, names: FrozenSet[str]) -> str:
+    """Quita de la marca las palabras que repiten el principio activo.
+
+    En productos genéricos ("ATRAZINA 90 ACME") el nombre del activo domina
+    la similitud de marcas; lo que distingue al producto es el resto.
+    """
+    active_tokens = {token for name in names for token in name.split() if len(token) >= 4}
+    kept = [
+        token
+        for token in marca.split()
+        if len(token) < 4 or not any(token.startswith(a) or a.startswith(token) for a in active_tokens)
+    ]
+    return " ".join(kept) if kept else marca
+
+
+def jaccard(left: FrozenSet, right: FrozenSet) -> float:
+    if not left and not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+@dataclass
+class _Entry:
+    row: Mapping[str, str]
+    marca: str
+    core: str
+    grams: Set[str]
+    names: FrozenSet[str]
+    pairs: FrozenSet[Tuple[str, str]]
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, str]) -> "_Entry":
+        marca = normalize_text(row.get("marca", ""))
+        names, pairs = parse_activos(row.get("activos", ""))
+        return cls(
+            row=row,
+            marca=marca,
+            core=brand_core(marca, names),
+            grams=trigrams(marca),
+            names=names,
+            pairs=pairs,
+        )
+
+    @property
+    def activos_key(self) -> Optional[str]:
+        return "|".join(sorted(self.names)) if self.names else None
+
+    @property
+    def concentration_key(self) -> Optional[str]:
+        """Firma de activos con sus concentraciones, para partir bloques de activos grandes."""
+        if not self.names:
+            return None
+        return "|".join(sorted(self.names)) + "#" + "|".join(f"{name}={value}" for name, value in sorted(self.pairs))
+
+    @property
+    def marca_key(self) -> Optional[str]:
+        """Marca normalizada sin espacios ("CLETO-AGRO" y "CLETOAGRO" coinciden)."""
+        return self.marca.replace(" ", "") or None
+
+
+@dataclass
+class Match:
+    score: float
+    sim_marca: float
+    sim_activos: float
+    nuevo: Mapping[str, str]
+    existente: Mapping[str, str]
+
+    def as_dict(self) -> Dict[str, str]:
+        return {
+            "score": f"{self.score:.3f}",
+            "sim_marca": f"{self.sim_marca:.3f}",
+            "sim_activos": f"{self.sim_activos:.3f}",
+            "registro_nuevo": self.nuevo.get("numero_registro", ""),
+            "marca_nuevo": self.nuevo.get("marca", ""),
+            "activos_nuevo": self.nuevo.get("activos", ""),
+            "registro_existente": self.existente.get("numero_registro", ""),
+            "marca_existente": self.existente.get("marca", ""),
+            "activos_existente": self.existente.get("activos", ""),
+        }
+
+
+class CatalogMatcher:
+    """Índices de blocking sobre el catálogo existente."""
+
+    def __init__(self, catalog: Iterable[Mapping[str, str]], max_block_size: int = MAX_BLOCK_SIZE) -> None:
+        self.entries: List[_Entry] = [_Entry.from_row(row) for row in catalog]
+        self.max_block_size = max_block_size
+        self._by_gram: Dict[str, List[int]] = defaultdict(list)
+        self._by_activos: Dict[str, List[int]] = defaultdict(list)
+        self._by_concentration: Dict[str, List[int]] = defaultdict(list)
+        self._by_marca: Dict[str, List[int]] = defaultdict(list)
+        for position, entry in enumerate(self.entries):
+            for gram in entry.grams:
+                self._by_gram[gram].append(position)
+            if entry.activos_key:
+                self._by_activos[entry.activos_key].append(position)
+                self._by_concentration[entry.concentration_key].append(position)
+            if entry.marca_key:
+                self._by_marca[entry.marca_key].append(position)
+
+    def candidates(self, entry: _Entry) -> Set[int]:
+        """Posiciones del catálogo que comparten suficientes bloques con ``entry``."""
+        shared: Counter = Counter()
+        for gram in entry.grams:
+            postings = self._by_gram.get(gram)
+            # Los trigramas demasiado comunes no discriminan: se ignoran.
+            if postings and len(postings) <= self.max_block_size:
+                shared.update(postings)
+
+        found: Set[int] = set()
+        for position, count in shared.items():
+            other = self.entries[position]
+            if count * 2 >= min(len(entry.grams), len(other.grams)):
+                found.add(position)
+
+        # La marca exacta nunca se descarta: es el caso típico de un renumerado.
+        if entry.marca_key:
+            found.update(self._by_marca.get(entry.marca_key, ()))
+
+        key = entry.activos_key
+        if key:
+            postings = self._by_activos.get(key, ())
+            if len(postings) > self.max_block_size:
+                # Activo muy común: se restringe a la misma concentración.
+                postings = self._by_concentration.get(entry.concentration_key, ())
+            found.update(postings)
+        return found
+
+    @staticmethod
+    def score(left: _Entry, right: _Entry) -> Tuple[float, float, float]:
+        sim_marca = SequenceMatcher(None, left.core, right.core).ratio() if left.core and right.core else 0.0
+        if left.names or right.names:
+            sim_activos = 0.7 * jaccard(left.names, right.names) + 0.3 * jaccard(left.pairs, right.pairs)
+            total = MARCA_WEIGHT * sim_marca + ACTIVOS_WEIGHT * sim_activos
+        else:
+            # Sin activos en ninguno de los dos sólo se puede comparar la marca.
+            sim_activos = 0.0
+            total = sim_marca
+        return total, sim_marca, sim_activos
+
+    def match(
+        self,
+        rows: Iterable[Mapping[str, str]],
+        threshold: float = DEFAULT_THRESHOLD,
+    ) -> List[Match]:
+        """Compara ``rows`` contra el catálogo."""
+        matches: List[Match] = []
+        for row in rows:
+            entry = _Entry.from_row(row)
+            for position in self.candidates(entry):
+                self._collect(entry, self.entries[position], threshold, matches)
+        matches.sort(key=lambda match: match.score, reverse=True)
+        return matches
+
+    def self_match(self, threshold: float = DEFAULT_THRESHOLD) -> List[Match]:
+        """Busca duplicados dentro del propio catálogo (cada par una sola vez)."""
+        matches: List[Match] = []
+        for position, entry in enumerate(self.entries):
+            for other in self.candidates(entry):
+                if other > position:
+                    self._collect(entry, self.entries[other], threshold, matches)
+        matches.sort(key=lambda match: match.score, reverse=True)
+        return matches
+
+    def _collect(self, entry: _Entry, other: _Entry, threshold: float, matches: List[Match]) -> None:
+        registro = entry.row.get("numero_registro", "").strip()
+        if registro and registro == other.row.get("numero_registro", "").strip():
+            return
+        # Cota superior barata antes de calcular la similitud completa.
+        quick_marca = SequenceMatcher(None, entry.core, other.core).real_quick_ratio()
+        bound = MARCA_WEIGHT * quick_marca + ACTIVOS_WEIGHT if entry.names or other.names else quick_marca
+        if bound < threshold:
+            return
+        score, sim_marca, sim_activos = self.score(entry, other)
+        if score >= threshold:
+            matches.append(Match(score, sim_marca, sim_activos, entry.row, other.row))
+
+
+def missed_renumbered(
+    catalog: Sequence[Mapping[str, str]],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> List[Mapping[str, str]]:
+    """Verificación de recall: filas cuya copia renumerada no coincide con el original.
+
+    Un producto re-registrado con la misma marca y activos es exactamente el
+    caso que el matcher debe detectar, así que la lista debería quedar vacía.
+    """
+    matcher = CatalogMatcher(catalog)
+    copies = [dict(row, numero_registro=f"{row.get('numero_registro', '')}-RENUMERADO") for row in catalog]
+    found = {(id(match.nuevo), id(match.existente)) for match in matcher.match(copies, threshold=threshold)}
+    return [
+        entry.row
+        for copy, entry in zip(copies, matcher.entries)
+        if (id(copy), id(entry.row)) not in found
+    ]
+
+
+def load_catalog(files: Sequence[Path]) -> List[Dict[str, str]]:
+    rows: List[Dict[str, str]] = []
+    for path in files:
+        if path and path.exists():
+            rows.extend(iter_product_rows(path))
+    return rows
+
+
+def write_report(path: Path, matches: Iterable[Match], append: bool = False) -> None:
+    """Escribe el reporte; con ``append`` agrega filas y sólo pone encabezado si el archivo es nuevo."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    write_header = not append or not path.exists() or path.stat().st_size == 0
+    with path.open("a" if append else "w", encoding="utf-8-sig", newline="") as csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=REPORT_FIELDS, delimiter=";", quoting=csv.QUOTE_ALL)
+        if write_header:
+            writer.writeheader()
+        for match in matches:
+            writer.writerow(match.as_dict())
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Detecta productos probablemente duplicados en el catálogo.")
+    parser.add_argument(
+        "--catalogo",
+        type=Path,
+        nargs="+",
+        required=True,
+        help="CSV del catálogo existente (salida del scraper o vademécum).",
+    )
+    parser.add_argument(
+        "--nuevos",
+        type=Path,
+        default=None,
+        help="CSV con productos a comparar; si se omite se buscan duplicados dentro del catálogo.",
+    )
+    parser.add_argument(
+        "--salida",
+        type=Path,
+        default=Path("posibles_duplicados.csv"),
+        help="Reporte CSV de pares candidatos (por defecto: %(default)s).",
+    )
+    parser.add_argument(
+        "--umbral",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Puntaje mínimo (0-1) para reportar un par (por defecto: %(default)s).",
+    )
+    parser.add_argument(
+        "--verificar",
+        action="store_true",
+        help="Comprueba que una copia renumerada de cada fila del catálogo se detecte como duplicado.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+    if args.verificar:
+        catalog = load_catalog(args.catalogo)
+        missed = missed_renumbered(catalog, threshold=args.umbral)
+        for row in missed:
+            print(f"[x] No detectado: {row.get('numero_registro', '')} | {row.get('marca', '')} | {row.get('activos', '')}")
+        print(f"[i] {len(catalog) - len(missed)}/{len(catalog)} copias renumeradas detectadas")
+        if missed:
+            raise SystemExit(1)
+        return
+
+    start = time.perf_counter()
+    matcher = CatalogMatcher(load_catalog(args.catalogo))
+    if args.nuevos:
+        matches = matcher.match(iter_product_rows(args.nuevos), threshold=args.umbral)
+    else:
+        matches = matcher.self_match(threshold=args.umbral)
+    elapsed = time.perf_counter() - start
+
+    write_report(args.salida, matches)
+    print(f"[i] {len(matches)} posibles duplicados en {elapsed:.1f} s -> {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
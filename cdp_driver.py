@@ -0,0 +1,745 @@
+#!/usr/bin/env python3
+"""
+Backend alternativo para SenasaScraper que habla con Chrome directamente por el
+protocolo DevTools (CDP) sobre WebSocket, sin pasar por chromedriver.
+
+Características principales:
+    - Lanza Chrome con ``--remote-debugging-port=0`` y se conecta al WebSocket
+      del navegador; cada pestaña se maneja como una sesión CDP "flatten".
+    - Los comandos se envían sin bloquear (``send`` devuelve un ``Future``), por
+      lo que varios pedidos pueden viajar en paralelo sobre la misma conexión.
+    - Permite suscribirse a eventos (carga de página, pestañas nuevas y cambios
+      del DOM vía MutationObserver) para reaccionar sin sleeps fijos.
+    - Expone la misma superficie que usa el scraper de ``webdriver.Chrome``
+      (``find_elements``, ``execute_script``, ``window_handles``, etc.), de modo
+      que ``WebDriverWait`` y ``expected_conditions`` siguen funcionando.
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import websocket
+from selenium.common.exceptions import (
+    NoSuchElementException,
+    NoSuchWindowException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+
+
+OBJECT_GROUP = "senasa-scraper"
+DOM_BINDING = "__alloteDomChanged"
+
+# Se inyecta en cada documento: agrupa las mutaciones del DOM y avisa al
+# scraper a lo sumo una vez por tarea del event loop.
+DOM_OBSERVER_SCRIPT = f"""
+(() => {{
+  if (window.__alloteObserver) return;
+  let pending = false;
+  const notify = () => {{
+    pending = false;
+    try {{ window.{DOM_BINDING}(''); }} catch (e) {{}}
+  }};
+  window.__alloteObserver = new MutationObserver(() => {{
+    if (!pending) {{ pending = true; setTimeout(notify, 0); }}
+  }});
+  window.__alloteObserver.observe(document, {{
+    childList: true, subtree: true, attributes: true, characterData: true
+  }});
+}})();
+"""
+
+FIND_ELEMENTS_FUNCTION = """
+function(by, selector) {
+  const root = this;
+  if (by === 'xpath') {
+    const doc = root.ownerDocument || root;
+    const snapshot = doc.evaluate(
+      selector, root, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    const found = [];
+    for (let i = 0; i < snapshot.snapshotLength; i++) {
+      found.push(snapshot.snapshotItem(i));
+    }
+    return found;
+  }
+  return Array.from(root.querySelectorAll(selector));
+}
+"""
+
+CHROME_CANDIDATES = (
+    "google-chrome",
+    "google-chrome-stable",
+    "chromium",
+    "chromium-browser",
+    "chrome",
+)
+
+
+class CdpError(WebDriverException):
+    """Error devuelto por Chrome para un comando CDP."""
+
+
+def find_chrome_binary() -> str:
+    """Busca el ejecutable de Chrome/Chromium en las ubicaciones habituales."""
+    explicit = os.environ.get("CHROME_BINARY")
+    if explicit:
+        return explicit
+
+    for name in CHROME_CANDIDATES:
+        found = shutil.which(name)
+        if found:
+            return found
+
+    candidates: List[Path] = []
+    if sys.platform.startswith("win"):
+        for env_name in ("PROGRAMFILES", "PROGRAMFILES(X86)", "LOCALAPPDATA"):
+            base = os.environ.get(env_name)
+            if base:
+                candidates.append(Path(base) / "Google" / "Chrome" / "Application" / "chrome.exe")
+    elif sys.platform == "darwin":
+        candidates.append(Path("/Applications/Google Chrome.app/Contents/MacOS/Google Chrome"))
+
+    for candidate in candidates:
+        if candidate.exists():
+            return str(candidate)
+
+    raise WebDriverException(
+        "No se encontró Chrome. Indicá la ruta con --chrome-binary o la variable CHROME_BINARY."
+    )
+
+
+def _selector_for(by: str, value: str) -> Tuple[str, str]:
+    """Traduce las estrategias de ``By`` a XPath o selector CSS."""
+    if by in ("xpath", "css selector"):
+        return by, value
+    if by == "tag name":
+        return "css selector", value
+    if by == "id":
+        return "css selector", f"[id={json.dumps(value)}]"
+    if by == "name":
+        return "css selector", f"[name={json.dumps(value)}]"
+    if by == "class name":
+        return "css selector", f".{value}"
+    raise WebDriverException(f"Estrategia de búsqueda no soportada por el backend CDP: {by}")
+
+
+# ------------------------------------------------------------------------- #
+# Conexión WebSocket
+# ------------------------------------------------------------------------- #
+class CdpConnection:
+    """Conexión al WebSocket de DevTools con comandos en paralelo y eventos."""
+
+    def __init__(self, ws_url: str, command_timeout: float = 180) -> None:
+        self.command_timeout = command_timeout
+        self._ws = websocket.create_connection(
+            ws_url,
+            suppress_origin=True,
+            enable_multithread=True,
+        )
+        self._ids = itertools.count(1)
+        self._pending: Dict[int, Future] = {}
+        self._listeners: Dict[str, List[Callable[[Dict[str, Any], Optional[str]], None]]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, name="cdp-reader", daemon=True)
+        self._reader.start()
+
+    def send(
+        self,
+        method: str,
+        params: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+    ) -> Future:
+        """Envía un comando sin esperar la respuesta."""
+        message_id = next(self._ids)
+        payload: Dict[str, Any] = {"id": message_id, "method": method, "params": params or {}}
+        if session_id:
+            payload["sessionId"] = session_id
+
+        future: Future = Future()
+        with self._lock:
+            if self._closed:
+                raise WebDriverException("La conexión con Chrome está cerrada")
+            self._pending[message_id] = future
+        try:
+            self._ws.send(json.dumps(payload))
+        except Exception as exc:
+            with self._lock:
+                self._pending.pop(message_id, None)
+            raise WebDriverException(f"No se pudo enviar {method}: {exc}") from exc
+        return future
+
+    def call(
+        self,
+        method: str,
+        params: Optional[Dict[str, Any]] = None,
+        session_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Envía un comando y espera su resultado."""
+        return self._result(method, self.send(method, params, session_id), timeout)
+
+    def call_many(
+        self,
+        commands: Sequence[Tuple[str, Optional[Dict[str, Any]]]],
+        session_id: Optional[str] = None,
+        timeout: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        """Envía todos los comandos de una vez y luego recoge las respuestas en orden."""
+        futures = [(method, self.send(method, params, session_id)) for method, params in commands]
+        return [self._result(method, future, timeout) for method, future in futures]
+
+    def _result(self, method: str, future: Future, timeout: Optional[float]) -> Dict[str, Any]:
+        try:
+            return future.result(timeout or self.command_timeout)
+        except FutureTimeoutError as exc:
+            raise TimeoutException(f"Chrome no respondió a {method}") from exc
+
+    def on(
+        self,
+        method: str,
+        callback: Callable[[Dict[str, Any], Optional[str]], None],
+    ) -> Callable[[], None]:
+        """Registra un callback para un evento CDP y devuelve la función para quitarlo.
+
+        Los callbacks corren en el hilo lector: no deben llamar a ``call``.
+        """
+        with self._lock:
+            self._listeners[method].append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._listeners[method]:
+                    self._listeners[method].remove(callback)
+
+        return unsubscribe
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        try:
+            self._ws.close()
+        except Exception:
+            pass
+
+    def _read_loop(self) -> None:
+        while True:
+            try:
+                raw = self._ws.recv()
+            except Exception:
+                break
+            if not raw:
+                continue
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+
+            if "id" in message:
+                with self._lock:
+                    future = self._pending.pop(message["id"], None)
+                if future is None:
+                    continue
+                if "error" in message:
+                    error = message["error"]
+                    future.set_exception(CdpError(f"{error.get('message')} ({error.get('code')})"))
+                else:
+                    future.set_result(message.get("result", {}))
+                continue
+
+            method = message.get("method")
+            if not method:
+                continue
+            with self._lock:
+                listeners = list(self._listeners.get(method, ()))
+            for listener in listeners:
+                try:
+                    listener(message.get("params", {}), message.get("sessionId"))
+                except Exception:
+                    pass
+
+        with self._lock:
+            self._closed = True
+            pending = list(self._pending.values())
+            self._pending.clear()
+        for future in pending:
+            if not future.done():
+                future.set_exception(WebDriverException("Se perdió la conexión con Chrome"))
+
+
+# ------------------------------------------------------------------------- #
+# Elementos
+# ------------------------------------------------------------------------- #
+class CdpElement:
+    """Referencia a un nodo del DOM, compatible con el uso que hace el scraper de WebElement."""
+
+    def __init__(self, driver: "CdpDriver", object_id: str, session_id: str) -> None:
+        self._driver = driver
+        self._object_id = object_id
+        self._session_id = session_id
+
+    @property
+    def object_id(self) -> str:
+        return self._object_id
+
+    def _call_function(self, declaration: str, *args: Any) -> Any:
+        return self._driver._call_function_on(self._object_id, declaration, args, self._session_id)
+
+    @property
+    def text(self) -> str:
+        return self._call_function("function() { return this.innerText || ''; }") or ""
+
+    def get_attribute(self, name: str) -> Optional[str]:
+        return self._call_function(
+            "function(name) {"
+            " const prop = this[name];"
+            " if (prop !== undefined && prop !== null && typeof prop !== 'object'"
+            "     && typeof prop !== 'function') { return String(prop); }"
+            " return this.getAttribute(name); }",
+            name,
+        )
+
+    def is_displayed(self) -> bool:
+        return bool(
+            self._call_function(
+                "function() {"
+                " const style = window.getComputedStyle(this);"
+                " if (style.visibility === 'hidden' || style.display === 'none') return false;"
+                " return !!(this.offsetWidth || this.offsetHeight || this.getClientRects().length); }"
+            )
+        )
+
+    def is_enabled(self) -> bool:
+        return bool(self._call_function("function() { return !this.disabled; }"))
+
+    def click(self) -> None:
+        self._driver._mark_action()
+        self._call_function(
+            "function() { this.scrollIntoView({block: 'center'}); this.click(); }"
+        )
+
+    def find_elements(self, by: str = "css selector", value: Optional[str] = None) -> List["CdpElement"]:
+        strategy, selector = _selector_for(by, value or "")
+        result = self._driver._connection.call(
+            "Runtime.callFunctionOn",
+            {
+                "functionDeclaration": FIND_ELEMENTS_FUNCTION,
+                "objectId": self._object_id,
+                "arguments": [{"value": strategy}, {"value": selector}],
+                "objectGroup": OBJECT_GROUP,
+            },
+            session_id=self._session_id,
+        )
+        return self._driver._unpack_elements(result, self._session_id)
+
+    def find_element(self, by: str = "css selector", value: Optional[str] = None) -> "CdpElement":
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"No se encontró el elemento {by}={value}")
+        return elements[0]
+
+
+class _SwitchTo:
+    def __init__(self, driver: "CdpDriver") -> None:
+        self._driver = driver
+
+    def window(self, handle: str) -> None:
+        self._driver._activate(handle)
+
+
+# ------------------------------------------------------------------------- #
+# Driver
+# ------------------------------------------------------------------------- #
+class CdpDriver:
+    """Controla una instancia de Chrome por CDP imitando la API de ``webdriver.Chrome``."""
+
+    def __init__(
+        self,
+        arguments: Sequence[str] = (),
+        binary: Optional[str] = None,
+        command_timeout: float = 180,
+        page_load_timeout: float = 120,
+        startup_timeout: float = 30,
+    ) -> None:
+        self.page_load_timeout = page_load_timeout
+        self.switch_to = _SwitchTo(self)
+        self._user_data_dir = tempfile.mkdtemp(prefix="senasa-cdp-")
+        self._process = subprocess.Popen(
+            [
+                binary or find_chrome_binary(),
+                "--remote-debugging-port=0",
+                f"--user-data-dir={self._user_data_dir}",
+                "--no-first-run",
+                "--no-default-browser-check",
+                *arguments,
+                "about:blank",
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        self._sessions: Dict[str, str] = {}
+        self._handle_order: List[str] = []
+        self._current: Optional[str] = None
+        self._activity = threading.Condition()
+        self._last_activity = 0.0
+        self._action_mark = 0.0
+
+        try:
+            ws_url = self._wait_for_endpoint(startup_timeout)
+            self._connection = CdpConnection(ws_url, command_timeout=command_timeout)
+            self._connection.on("Runtime.bindingCalled", self._on_binding_called)
+            self._connection.on("Target.targetCreated", self._on_target_created)
+            self._connection.call("Target.setDiscoverTargets", {"discover": True})
+            pages = self._page_targets()
+            if not pages:
+                raise WebDriverException("Chrome no abrió ninguna pestaña")
+            self._activate(pages[0])
+        except Exception:
+            self._process.kill()
+            self._terminate()
+            raise
+
+    # ------------------------------------------------------------------ #
+    # Ciclo de vida
+    # ------------------------------------------------------------------ #
+    def _wait_for_endpoint(self, timeout: float) -> str:
+        port_file = Path(self._user_data_dir) / "DevToolsActivePort"
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise WebDriverException("Chrome terminó antes de abrir el puerto de DevTools")
+            try:
+                port, path = port_file.read_text(encoding="utf-8").split("\n")[:2]
+            except (OSError, ValueError):
+                time.sleep(0.05)
+                continue
+            if port.strip() and path.strip():
+                return f"ws://127.0.0.1:{port.strip()}{path.strip()}"
+            time.sleep(0.05)
+        raise WebDriverException("Timeout esperando el puerto de DevTools de Chrome")
+
+    def quit(self) -> None:
+        connection = getattr(self, "_connection", None)
+        if connection is not None:
+            try:
+                connection.call("Browser.close", timeout=5)
+            except Exception:
+                pass
+            connection.close()
+        self._terminate()
+
+    def _terminate(self) -> None:
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+        shutil.rmtree(self._user_data_dir, ignore_errors=True)
+
+    def set_page_load_timeout(self, seconds: float) -> None:
+        self.page_load_timeout = seconds
+
+    # ------------------------------------------------------------------ #
+    # Pestañas y sesiones
+    # ------------------------------------------------------------------ #
+    def _page_targets(self) -> List[str]:
+        targets = self._connection.call("Target.getTargets").get("targetInfos", [])
+        current = [info["targetId"] for info in targets if info.get("type") == "page"]
+        for target_id in current:
+            if target_id not in self._handle_order:
+                self._handle_order.append(target_id)
+        return [handle for handle in self._handle_order if handle in current]
+
+    def _activate(self, handle: str) -> None:
+        if handle not in self._sessions:
+            try:
+                result = self._connection.call(
+                    "Target.attachToTarget",
+                    {"targetId": handle, "flatten": True},
+                )
+            except CdpError as exc:
+                raise NoSuchWindowException(f"No existe la pestaña {handle}") from exc
+            session_id = result["sessionId"]
+            self._connection.call_many(
+                [
+                    ("Page.enable", None),
+                    ("Runtime.enable", None),
+                    ("Runtime.addBinding", {"name": DOM_BINDING}),
+                    ("Page.addScriptToEvaluateOnNewDocument", {"source": DOM_OBSERVER_SCRIPT}),
+                    ("Runtime.evaluate", {"expression": DOM_OBSERVER_SCRIPT}),
+                ],
+                session_id=session_id,
+            )
+            self._sessions[handle] = session_id
+        self._current = handle
+
+    @property
+    def _session(self) -> str:
+        if self._current is None or self._current not in self._sessions:
+            raise NoSuchWindowException("No hay una pestaña activa")
+        return self._sessions[self._current]
+
+    @property
+    def window_handles(self) -> List[str]:
+        return self._page_targets()
+
+    @property
+    def current_window_handle(self) -> str:
+        if self._current is None:
+            raise NoSuchWindowException("No hay una pestaña activa")
+        return self._current
+
+    def close(self) -> None:
+        handle = self.current_window_handle
+        self._connection.call("Target.closeTarget", {"targetId": handle})
+        self._sessions.pop(handle, None)
+        if handle in self._handle_order:
+            self._handle_order.remove(handle)
+        self._current = None
+
+    # ------------------------------------------------------------------ #
+    # Eventos
+    # ------------------------------------------------------------------ #
+    def on(
+        self,
+        method: str,
+        callback: Callable[[Dict[str, Any], Optional[str]], None],
+    ) -> Callable[[], None]:
+        """Suscribe un callback a un evento CDP (ver ``CdpConnection.on``)."""
+        return self._connection.on(method, callback)
+
+    def _notify_activity(self) -> None:
+        with self._activity:
+            self._last_activity = time.monotonic()
+            self._activity.notify_all()
+
+    def _on_binding_called(self, params: Dict[str, Any], session_id: Optional[str]) -> None:
+        if params.get("name") != DOM_BINDING:
+            return
+        if self._current is not None and session_id == self._sessions.get(self._current):
+            self._notify_activity()
+
+    def _on_target_created(self, params: Dict[str, Any], session_id: Optional[str]) -> None:
+        if params.get("targetInfo", {}).get("type") == "page":
+            self._notify_activity()
+
+    def _mark_action(self) -> None:
+        self._action_mark = time.monotonic()
+
+    def wait_for_dom_settle(self, timeout: float, quiet: float = 0.05) -> bool:
+        """Espera a que el DOM cambie tras la última acción y luego quede quieto.
+
+        Devuelve ``False`` si no hubo actividad dentro de ``timeout`` segundos,
+        en cuyo caso el tiempo consumido equivale al sleep fijo que reemplaza.
+        """
+        deadline = time.monotonic() + timeout
+        with self._activity:
+            while True:
+                now = time.monotonic()
+                if self._last_activity > self._action_mark and now - self._last_activity >= quiet:
+                    return True
+                if now >= deadline:
+                    return self._last_activity > self._action_mark
+                if self._last_activity > self._action_mark:
+                    wait_for = self._last_activity + quiet - now
+                else:
+                    wait_for = deadline - now
+                self._activity.wait(max(0.0, min(wait_for, deadline - now)))
+
+    def _wait_for_navigation(self, trigger: Callable[[], None], events: Sequence[str], strict: bool) -> None:
+        session_id = self._session
+        done = threading.Event()
+
+        def listener(params: Dict[str, Any], event_session: Optional[str]) -> None:
+            if event_session == session_id:
+                done.set()
+
+        unsubscribers = [self._connection.on(event, listener) for event in events]
+        try:
+            trigger()
+            if not done.wait(self.page_load_timeout) and strict:
+                raise TimeoutException("Timeout esperando la carga de la página")
+        finally:
+            for unsubscribe in unsubscribers:
+                unsubscribe()
+
+    # ------------------------------------------------------------------ #
+    # Navegación
+    # ------------------------------------------------------------------ #
+    def release_objects(self) -> None:
+        """Libera en Chrome todos los elementos obtenidos hasta ahora en la pestaña actual.
+
+        Los ``CdpElement`` previos dejan de ser válidos; conviene llamarlo al
+        terminar con una página para que los handles no se acumulen.
+        """
+        self._connection.send("Runtime.releaseObjectGroup", {"objectGroup": OBJECT_GROUP}, self._session)
+
+    def get(self, url: str) -> None:
+        session_id = self._session
+        self.release_objects()
+
+        def navigate() -> None:
+            result = self._connection.call("Page.navigate", {"url": url}, session_id=session_id)
+            if result.get("errorText"):
+                raise WebDriverException(f"No se pudo abrir {url}: {result['errorText']}")
+
+        self._wait_for_navigation(navigate, ("Page.loadEventFired",), strict=True)
+
+    def back(self) -> None:
+        session_id = self._session
+        history = self._connection.call("Page.getNavigationHistory", session_id=session_id)
+        index = history.get("currentIndex", 0)
+        if index <= 0:
+            return
+        entry_id = history["entries"][index - 1]["id"]
+        self._mark_action()
+        self._wait_for_navigation(
+            lambda: self._connection.call(
+                "Page.navigateToHistoryEntry",
+                {"entryId": entry_id},
+                session_id=session_id,
+            ),
+            ("Page.loadEventFired", "Page.navigatedWithinDocument"),
+            strict=False,
+        )
+
+    @property
+    def page_source(self) -> str:
+        result = self._connection.call(
+            "Runtime.evaluate",
+            {"expression": "document.documentElement.outerHTML", "returnByValue": True},
+            session_id=self._session,
+        )
+        return result.get("result", {}).get("value") or ""
+
+    # ------------------------------------------------------------------ #
+    # Elementos y scripts
+    # ------------------------------------------------------------------ #
+    def find_elements(self, by: str = "css selector", value: Optional[str] = None) -> List[CdpElement]:
+        strategy, selector = _selector_for(by, value or "")
+        session_id = self._session
+        expression = (
+            f"({FIND_ELEMENTS_FUNCTION}).call(document, "
+            f"{json.dumps(strategy)}, {json.dumps(selector)})"
+        )
+        result = self._connection.call(
+            "Runtime.evaluate",
+            {"expression": expression, "objectGroup": OBJECT_GROUP},
+            session_id=session_id,
+        )
+        return self._unpack_elements(result, session_id)
+
+    def find_element(self, by: str = "css selector", value: Optional[str] = None) -> CdpElement:
+        elements = self.find_elements(by, value)
+        if not elements:
+            raise NoSuchElementException(f"No se encontró el elemento {by}={value}")
+        return elements[0]
+
+    def texts(self, elements: Sequence[CdpElement]) -> List[str]:
+        """Lee el texto de varios elementos con un único viaje de ida y vuelta."""
+        if not elements:
+            return []
+        session_id = elements[0]._session_id
+        results = self._connection.call_many(
+            [
+                (
+                    "Runtime.callFunctionOn",
+                    {
+                        "functionDeclaration": "function() { return this.innerText || ''; }",
+                        "objectId": element.object_id,
+                        "returnByValue": True,
+                    },
+                )
+                for element in elements
+            ],
+            session_id=session_id,
+        )
+        return [result.get("result", {}).get("value") or "" for result in results]
+
+    def execute_script(self, script: str, *args: Any) -> Any:
+        """Ejecuta ``script`` como cuerpo de función, con ``arguments`` al estilo Selenium."""
+        session_id = self._session
+        target = next((arg for arg in args if isinstance(arg, CdpElement)), None)
+        if target is not None:
+            object_id = target.object_id
+        else:
+            window = self._connection.call(
+                "Runtime.evaluate",
+                {"expression": "window", "objectGroup": OBJECT_GROUP},
+                session_id=session_id,
+            )
+            object_id = window["result"]["objectId"]
+        self._mark_action()
+        return self._call_function_on(object_id, f"function() {{ {script} }}", args, session_id)
+
+    def _call_function_on(
+        self,
+        object_id: str,
+        declaration: str,
+        args: Sequence[Any],
+        session_id: str,
+    ) -> Any:
+        call_arguments = [
+            {"objectId": arg.object_id} if isinstance(arg, CdpElement) else {"value": arg}
+            for arg in args
+        ]
+        try:
+            result = self._connection.call(
+                "Runtime.callFunctionOn",
+                {
+                    "functionDeclaration": declaration,
+                    "objectId": object_id,
+                    "arguments": call_arguments,
+                    "objectGroup": OBJECT_GROUP,
+                },
+                session_id=session_id,
+            )
+        except CdpError as exc:
+            if "object" in str(exc).lower() or "context" in str(exc).lower():
+                raise StaleElementReferenceException(str(exc)) from exc
+            raise
+        self._raise_for_exception(result)
+        remote = result.get("result", {})
+        if remote.get("subtype") == "node" and remote.get("objectId"):
+            return CdpElement(self, remote["objectId"], session_id)
+        return remote.get("value")
+
+    def _unpack_elements(self, result: Dict[str, Any], session_id: str) -> List[CdpElement]:
+        self._raise_for_exception(result)
+        array_id = result.get("result", {}).get("objectId")
+        if not array_id:
+            return []
+        properties = self._connection.call(
+            "Runtime.getProperties",
+            {"objectId": array_id, "ownProperties": True},
+            session_id=session_id,
+        )
+        self._connection.send("Runtime.releaseObject", {"objectId": array_id}, session_id)
+        indexed = []
+        for prop in properties.get("result", []):
+            name = prop.get("name", "")
+            value = prop.get("value", {})
+            if name.isdigit() and value.get("objectId"):
+                indexed.append((int(name), CdpElement(self, value["objectId"], session_id)))
+        return [element for _, element in sorted(indexed, key=lambda item: item[0])]
+
+    @staticmethod
+    def _raise_for_exception(result: Dict[str, Any]) -> None:
+        details = result.get("exceptionDetails")
+        if details:
+            description = details.get("exception", {}).get("description") or details.get("text")
+            raise WebDriverException(f"Error de JavaScript: {description}")
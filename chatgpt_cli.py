@@ -2,47 +2,410 @@ import openai
 import os
 import json
 import glob
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 openai.api_key = os.getenv("OPENAI_API_KEY")
-HISTORIAL_FILE = "historial_chat.json"
+MODELO = "gpt-5"  # o gpt-5 si tenés acceso
+HISTORIAL_FILE = "historial_chat.jsonl"
+HISTORIAL_ANTERIOR = "historial_chat.json"
 
-if os.path.exists(HISTORIAL_FILE):
-    with open(HISTORIAL_FILE, "r", encoding="utf-8") as f:
-        historial = json.load(f)
-else:
-    historial = []
+# Presupuesto de tokens del contexto que se envía en cada turno. Al superar el
+# umbral de compactación, los turnos viejos se resumen en segundo plano.
+PRESUPUESTO_TOKENS = int(os.getenv("CHAT_TOKEN_BUDGET", "12000"))
+UMBRAL_COMPACTACION = 0.75
+MENSAJES_RECIENTES = 6
 
-print("💬 ChatGPT CLI - Comando especial: analizar <ruta> para enviar un archivo.\n")
+# Análisis de archivos grandes: se dividen en fragmentos, se analizan en
+# paralelo y las respuestas parciales se combinan en una sola.
+TOKENS_POR_FRAGMENTO = int(os.getenv("CHAT_CHUNK_TOKENS", "3000"))
+ANALISIS_PARALELOS = int(os.getenv("CHAT_ANALYSIS_WORKERS", "4"))
+CACHE_ANALISIS = ".cache_analisis"
+DIRECTORIOS_IGNORADOS = {".git", ".gradle", ".idea", ".kotlin", "build", "__pycache__", CACHE_ANALISIS}
 
-while True:
-    prompt = input("Tú: ")
+PROMPT_ARCHIVO = "Analiza el siguiente archivo de mi app:\n\n"
+PROMPT_FRAGMENTO = (
+    "Analiza el siguiente fragmento de mi app. Es sólo una parte de un análisis "
+    "mayor: describe qué hace y señala problemas o mejoras concretas.\n\n"
+)
+PROMPT_COMBINAR = (
+    "Estos son análisis parciales de distintos fragmentos de mi app. "
+    "Combínalos en un único análisis coherente, sin repetir puntos:\n\n"
+)
 
-    if prompt.lower() in ["salir", "exit", "quit"]:
-        with open(HISTORIAL_FILE, "w", encoding="utf-8") as f:
-            json.dump(historial, f, ensure_ascii=False, indent=2)
-        break
+PROMPT_RESUMEN = (
+    "Resume la conversación previa entre el usuario y el asistente en español. "
+    "Conserva decisiones tomadas, nombres de archivos, clases y funciones, "
+    "errores mencionados y tareas pendientes. Sé conciso."
+)
 
-    # Si el usuario escribe "analizar archivo.ext"
-    if prompt.lower().startswith("analizar "):
-        ruta = prompt.split(" ", 1)[1]
+try:
+    import tiktoken
+
+    _codificador = tiktoken.get_encoding("cl100k_base")
+
+    def contar_tokens(texto):
+        return len(_codificador.encode(texto))
+except ImportError:
+    def contar_tokens(texto):
+        # Aproximación: ~4 caracteres por token.
+        return len(texto) // 4 + 1
+
+
+def tokens_mensaje(mensaje):
+    return contar_tokens(mensaje["content"]) + 4
+
+
+class ContextoConversacion:
+    """Historial append-only en JSONL con un contexto acotado por tokens.
+
+    Cada mensaje se agrega al archivo apenas ocurre. Los resúmenes también se
+    agregan como registros ``{"tipo": "resumen", "cubre": n, ...}``: al cargar,
+    el último resumen reemplaza a los primeros ``n`` mensajes del archivo.
+    """
+
+    def __init__(self, ruta, presupuesto=PRESUPUESTO_TOKENS):
+        self.ruta = ruta
+        self.presupuesto = presupuesto
+        self.resumen = None
+        self.mensajes = []
+        self.total_mensajes = 0
+        self._lock = threading.Lock()
+        self._compactador = None
+        self._migrar_historial_anterior()
+        self._reparar_cola()
+        self._cargar()
+
+    def _migrar_historial_anterior(self):
+        if os.path.exists(self.ruta) or not os.path.exists(HISTORIAL_ANTERIOR):
+            return
+        with open(HISTORIAL_ANTERIOR, "r", encoding="utf-8") as f:
+            anteriores = json.load(f)
+        with open(self.ruta, "w", encoding="utf-8") as f:
+            for mensaje in anteriores:
+                f.write(json.dumps(mensaje, ensure_ascii=False) + "\n")
+
+    def _reparar_cola(self, bloque=4096):
+        """Descarta una última línea sin ``\\n`` (escritura cortada a la mitad).
+
+        Si quedara, el próximo ``_escribir`` se pegaría a ella y ese mensaje
+        también se perdería al cargar.
+        """
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, "rb+") as f:
+            tamano = f.seek(0, os.SEEK_END)
+            if tamano == 0:
+                return
+            f.seek(tamano - 1)
+            if f.read(1) == b"\n":
+                return
+            fin = tamano
+            corte = 0
+            while fin > 0:
+                inicio = max(0, fin - bloque)
+                f.seek(inicio)
+                posicion = f.read(fin - inicio).rfind(b"\n")
+                if posicion != -1:
+                    corte = inicio + posicion + 1
+                    break
+                fin = inicio
+            f.truncate(corte)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _cargar(self):
+        if not os.path.exists(self.ruta):
+            return
+        todos = []
+        with open(self.ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                linea = linea.strip()
+                if not linea:
+                    continue
+                try:
+                    registro = json.loads(linea)
+                except ValueError:
+                    # Línea corrupta: se ignora (una cola truncada ya se recortó al abrir).
+                    continue
+                if registro.get("tipo") == "resumen":
+                    self.resumen = registro
+                else:
+                    todos.append({"role": registro["role"], "content": registro["content"]})
+        self.total_mensajes = len(todos)
+        inicio = self.resumen["cubre"] if self.resumen else 0
+        self.mensajes = todos[inicio:]
+
+    def _escribir(self, registro):
+        with open(self.ruta, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def agregar(self, rol, contenido):
+        mensaje = {"role": rol, "content": contenido}
+        with self._lock:
+            self._escribir(mensaje)
+            self.mensajes.append(mensaje)
+            self.total_mensajes += 1
+
+    def _mensaje_resumen(self):
+        if not self.resumen:
+            return []
+        return [{
+            "role": "system",
+            "content": "Resumen de la conversación anterior:\n" + self.resumen["content"],
+        }]
+
+    def tokens(self):
+        with self._lock:
+            return sum(tokens_mensaje(m) for m in self._mensaje_resumen() + self.mensajes)
+
+    def para_enviar(self):
+        """Devuelve los mensajes a enviar, recortando los más viejos si no entran."""
+        with self._lock:
+            previos = self._mensaje_resumen()
+            recientes = list(self.mensajes)
+        disponible = self.presupuesto - sum(tokens_mensaje(m) for m in previos)
+        seleccion = []
+        for mensaje in reversed(recientes):
+            costo = tokens_mensaje(mensaje)
+            if seleccion and costo > disponible:
+                break
+            seleccion.append(mensaje)
+            disponible -= costo
+        return previos + list(reversed(seleccion))
+
+    def compactar_en_segundo_plano(self, resumir):
+        """Resume los turnos viejos en otro hilo para no demorar el próximo turno."""
+        if self.tokens() < self.presupuesto * UMBRAL_COMPACTACION:
+            return
+        if self._compactador and self._compactador.is_alive():
+            return
+        self._compactador = threading.Thread(target=self._compactar, args=(resumir,), daemon=True)
+        self._compactador.start()
+
+    def _compactar(self, resumir):
+        with self._lock:
+            cantidad = len(self.mensajes) - MENSAJES_RECIENTES
+            if cantidad <= 0:
+                return
+            viejos = self._mensaje_resumen() + self.mensajes[:cantidad]
+            cubre = self.total_mensajes - len(self.mensajes) + cantidad
+        try:
+            texto = resumir(viejos)
+        except Exception as e:
+            print(f"\n⚠️ No se pudo resumir el historial: {e}")
+            return
+        registro = {"tipo": "resumen", "cubre": cubre, "content": texto}
+        with self._lock:
+            self._escribir(registro)
+            self.resumen = registro
+            # Mientras se resumía sólo se agregaron mensajes al final.
+            self.mensajes = self.mensajes[cantidad:]
+
+    def esperar(self):
+        if self._compactador:
+            self._compactador.join()
+
+
+def completar(mensajes):
+    respuesta = openai.ChatCompletion.create(model=MODELO, messages=mensajes)
+    return respuesta.choices[0].message["content"]
+
+
+def resumir(mensajes):
+    transcripcion = "\n\n".join(f"{m['role']}: {m['content']}" for m in mensajes)
+    return completar([
+        {"role": "system", "content": PROMPT_RESUMEN},
+        {"role": "user", "content": transcripcion},
+    ])
+
+
+def responder_en_stream(mensajes):
+    """Imprime la respuesta a medida que llegan los tokens y la devuelve completa."""
+    partes = []
+    print("ChatGPT: ", end="", flush=True)
+    for fragmento in openai.ChatCompletion.create(model=MODELO, messages=mensajes, stream=True):
+        if not fragmento.choices:
+            continue
+        texto = fragmento.choices[0].delta.get("content")
+        if texto:
+            partes.append(texto)
+            print(texto, end="", flush=True)
+    print("\n")
+    return "".join(partes)
+
+
+def _ruta_cache(mensajes):
+    serializado = json.dumps([MODELO, mensajes], ensure_ascii=False, sort_keys=True)
+    clave = hashlib.sha256(serializado.encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_ANALISIS, f"{clave}.json")
+
+
+def completar_con_cache(mensajes, stream=False):
+    """Como ``completar``, pero reutiliza respuestas previas para el mismo contenido."""
+    ruta = _ruta_cache(mensajes)
+    if os.path.exists(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            texto = json.load(f)["respuesta"]
+        if stream:
+            print("ChatGPT:", texto, "\n")
+        return texto
+
+    texto = responder_en_stream(mensajes) if stream else completar(mensajes)
+    os.makedirs(CACHE_ANALISIS, exist_ok=True)
+    temporal = f"{ruta}.{threading.get_ident()}.tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump({"respuesta": texto}, f, ensure_ascii=False)
+    os.replace(temporal, ruta)
+    return texto
+
+
+def _es_texto(ruta):
+    with open(ruta, "rb") as f:
+        return b"\0" not in f.read(1024)
+
+
+def expandir_rutas(patron):
+    """Acepta un archivo, un directorio (recursivo) o un glob como ``app/**/*.kt``."""
+    if os.path.isdir(patron):
+        candidatos = []
+        for raiz, directorios, archivos in os.walk(patron):
+            directorios[:] = sorted(d for d in directorios if d not in DIRECTORIOS_IGNORADOS)
+            candidatos.extend(os.path.join(raiz, nombre) for nombre in sorted(archivos))
+    else:
+        candidatos = sorted(glob.glob(patron, recursive=True))
+    return [ruta for ruta in candidatos if os.path.isfile(ruta) and _es_texto(ruta)]
+
+
+def dividir_en_fragmentos(ruta, contenido, limite=TOKENS_POR_FRAGMENTO):
+    """Corta el contenido por líneas en bloques de a lo sumo ``limite`` tokens."""
+    bloques = []
+    actual, tokens_actual, inicio = [], 0, 1
+    for numero, linea in enumerate(contenido.splitlines(keepends=True), start=1):
+        # Las líneas que por sí solas exceden el límite se cortan por caracteres.
+        while contar_tokens(linea) > limite:
+            corte = limite * 4
+            linea_larga, linea = linea[:corte], linea[corte:]
+            if actual:
+                bloques.append((inicio, numero - 1, "".join(actual)))
+            bloques.append((numero, numero, linea_larga))
+            actual, tokens_actual, inicio = [], 0, numero
+        costo = contar_tokens(linea)
+        if actual and tokens_actual + costo > limite:
+            bloques.append((inicio, numero - 1, "".join(actual)))
+            actual, tokens_actual, inicio = [], 0, numero
+        actual.append(linea)
+        tokens_actual += costo
+    if actual:
+        bloques.append((inicio, inicio + len(actual) - 1, "".join(actual)))
+
+    return [
+        f"Archivo: {ruta} (fragmento {i}/{len(bloques)}, líneas {desde}-{hasta})\n\n{texto}"
+        for i, (desde, hasta, texto) in enumerate(bloques, start=1)
+    ]
+
+
+def _agrupar(parciales, limite):
+    """Agrupa respuestas parciales hasta ``limite`` tokens, con al menos dos por grupo.
+
+    El mínimo de dos garantiza que cada nivel de combinación reduzca la cantidad
+    de grupos aunque las respuestas parciales sean más largas que el límite.
+    """
+    grupos, actual, tokens_actual = [], [], 0
+    for parcial in parciales:
+        costo = contar_tokens(parcial)
+        if len(actual) >= 2 and tokens_actual + costo > limite:
+            grupos.append(actual)
+            actual, tokens_actual = [], 0
+        actual.append(parcial)
+        tokens_actual += costo
+    if actual:
+        grupos.append(actual)
+    return grupos
+
+
+def analizar(patron):
+    """Analiza uno o varios archivos con map-reduce y devuelve la respuesta final."""
+    rutas = expandir_rutas(patron)
+    if not rutas:
+        print(f"⚠️ No se encontró el archivo {patron}")
+        return None
+
+    fragmentos = []
+    for ruta in rutas:
+        with open(ruta, "r", encoding="utf-8", errors="ignore") as f:
+            fragmentos.extend(dividir_en_fragmentos(ruta, f.read()))
+    if not fragmentos:
+        print(f"⚠️ {patron} no tiene contenido para analizar")
+        return None
+
+    if len(fragmentos) == 1:
+        return completar_con_cache([{"role": "user", "content": PROMPT_ARCHIVO + fragmentos[0]}], stream=True)
+
+    def analizar_fragmento(fragmento):
+        return completar_con_cache([{"role": "user", "content": PROMPT_FRAGMENTO + fragmento}])
+
+    def combinar(grupo, stream=False):
+        contenido = PROMPT_COMBINAR + "\n\n---\n\n".join(grupo)
+        return completar_con_cache([{"role": "user", "content": contenido}], stream=stream)
+
+    print(f"🔎 Analizando {len(rutas)} archivo(s) en {len(fragmentos)} fragmentos...")
+    with ThreadPoolExecutor(max_workers=ANALISIS_PARALELOS) as pool:
+        parciales = list(pool.map(analizar_fragmento, fragmentos))
+
+        # Si las respuestas parciales no entran en un solo pedido, se combinan por niveles.
+        grupos = _agrupar(parciales, TOKENS_POR_FRAGMENTO * 2)
+        while len(grupos) > 1:
+            parciales = list(pool.map(combinar, grupos))
+            grupos = _agrupar(parciales, TOKENS_POR_FRAGMENTO * 2)
+
+    return combinar(grupos[0], stream=True)
+
+
+def main():
+    contexto = ContextoConversacion(HISTORIAL_FILE)
+
+    print("💬 ChatGPT CLI - Comando especial: analizar <ruta> para enviar un archivo.\n")
+
+    while True:
         try:
-            with open(ruta, "r", encoding="utf-8", errors="ignore") as f:
-                contenido = f.read()
-            prompt = f"Analiza el siguiente archivo de mi app:\n\n{contenido}"
-        except FileNotFoundError:
-            print(f"⚠️ No se encontró el archivo {ruta}")
+            prompt = input("Tú: ")
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        if prompt.lower() in ["salir", "exit", "quit"]:
+            break
+
+        # Si el usuario escribe "analizar archivo.ext", "analizar carpeta/" o un glob.
+        # Al historial sólo pasa el pedido y el análisis final, no el contenido.
+        if prompt.lower().startswith("analizar "):
+            ruta = prompt.split(" ", 1)[1].strip()
+            try:
+                mensaje = analizar(ruta)
+            except Exception as e:
+                print("⚠️ Error:", e)
+                continue
+            if mensaje is not None:
+                contexto.agregar("user", f"Analiza {ruta} de mi app.")
+                contexto.agregar("assistant", mensaje)
+                contexto.compactar_en_segundo_plano(resumir)
             continue
 
-    historial.append({"role": "user", "content": prompt})
+        contexto.agregar("user", prompt)
+
+        try:
+            mensaje = responder_en_stream(contexto.para_enviar())
+            contexto.agregar("assistant", mensaje)
+            contexto.compactar_en_segundo_plano(resumir)
+
+        except Exception as e:
+            print("⚠️ Error:", e)
+
+    contexto.esperar()
 
-    try:
-        respuesta = openai.ChatCompletion.create(
-            model="gpt-5",  # o gpt-5 si tenés acceso
-            messages=historial
-        )
-        mensaje = respuesta.choices[0].message["content"]
-        print("ChatGPT:", mensaje, "\n")
-        historial.append({"role": "assistant", "content": mensaje})
 
-    except Exception as e:
-        print("⚠️ Error:", e)
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,36 @@
+import argparse
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+MODELO_POR_DEFECTO = "gemini-1.5-flash"
+CACHE_FILE = ".cache_gemini.sqlite"
+CACHE_TTL_SEGUNDOS = 7 * 24 * 3600
+CACHE_MAX_ENTRADAS = 5000
 
-import google.generativeai as genai
-import sys
-import os
+# Errores de la API que vale la pena reintentar (límite de cuota o fallas transitorias).
+ERRORES_REINTENTABLES = {
+    "ResourceExhausted",
+    "TooManyRequests",
+    "ServiceUnavailable",
+    "InternalServerError",
+    "DeadlineExceeded",
+    "ConnectionError",
+    "TimeoutError",
+}
 
 # Función para cargar variables de entorno desde un archivo .env
 def load_dotenv(dotenv_path=".env"):
     if not os.path.exists(dotenv_path):
-        print(f"Advertencia: El archivo {dotenv_path} no se encontró.")
+        # A stderr para no mezclarse con la salida JSONL del modo lote.
+        print(f"Advertencia: El archivo {dotenv_path} no se encontró.", file=sys.stderr)
         return
     with open(dotenv_path) as f:
         for line in f:
@@ -16,33 +39,368 @@ def load_dotenv(dotenv_path=".env"):
                 key, value = line.split("=", 1)
                 os.environ[key.strip()] = value.strip()
 
-# Cargar variables de entorno desde .env
-load_dotenv()
 
-# Configura la API key de Gemini desde las variables de entorno
-API_KEY = os.getenv("GEMINI_API_KEY")
+class CacheRespuestas:
+    """Cache persistente en SQLite con clave hash(modelo, prompt).
+
+    Las entradas vencen a los ``ttl`` segundos y, si se supera ``max_entradas``,
+    se descartan las usadas hace más tiempo (LRU).
+    """
+
+    def __init__(self, ruta=CACHE_FILE, ttl=CACHE_TTL_SEGUNDOS, max_entradas=CACHE_MAX_ENTRADAS):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS respuestas ("
+            " clave TEXT PRIMARY KEY, modelo TEXT, respuesta TEXT,"
+            " creado REAL, usado REAL)"
+        )
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS respuestas_usado ON respuestas (usado)")
+        self._conexion.commit()
+
+    @staticmethod
+    def clave(modelo, prompt):
+        return hashlib.sha256(f"{modelo}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def obtener(self, clave):
+        ahora = time.time()
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT respuesta, creado FROM respuestas WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None:
+                return None
+            if self.ttl and ahora - fila[1] > self.ttl:
+                self._conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+                self._conexion.commit()
+                return None
+            self._conexion.execute("UPDATE respuestas SET usado = ? WHERE clave = ?", (ahora, clave))
+            self._conexion.commit()
+            return fila[0]
+
+    def guardar(self, clave, modelo, respuesta):
+        ahora = time.time()
+        with self._lock:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?)",
+                (clave, modelo, respuesta, ahora, ahora),
+            )
+            sobrantes = self._conexion.execute("SELECT COUNT(*) FROM respuestas").fetchone()[0] - self.max_entradas
+            if sobrantes > 0:
+                self._conexion.execute(
+                    "DELETE FROM respuestas WHERE clave IN"
+                    " (SELECT clave FROM respuestas ORDER BY usado LIMIT ?)",
+                    (sobrantes,),
+                )
+            self._conexion.commit()
+
+
+class LimitadorTasa:
+    """Espacia los pedidos para no superar ``por_minuto`` pedidos por minuto."""
+
+    def __init__(self, por_minuto):
+        self.intervalo = 60.0 / por_minuto if por_minuto else 0.0
+        self._siguiente = 0.0
+        self._lock = threading.Lock()
+
+    def esperar_turno(self):
+        if not self.intervalo:
+            return
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._siguiente)
+            self._siguiente = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+def crear_modelo(nombre):
+    # Configura la API key de Gemini desde las variables de entorno
+    api_key = os.getenv("GEMINI_API_KEY")
+
+    if not api_key:
+        print("Error: La variable de entorno GEMINI_API_KEY no fue encontrada.", file=sys.stderr)
+        print("Asegúrate de que tu archivo .env contiene 'GEMINI_API_KEY=tu_clave_de_api'", file=sys.stderr)
+        sys.exit(1)
+
+    # El SDK se importa recién acá: si todo sale de la cache no hace falta.
+    import google.generativeai as genai
+
+    # GEMINI_API_ENDPOINT permite apuntar a un servidor local de pruebas.
+    endpoint = os.getenv("GEMINI_API_ENDPOINT")
+    if endpoint:
+        genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": endpoint})
+    else:
+        genai.configure(api_key=api_key)
+    return genai.GenerativeModel(nombre)
+
+
+def generar(modelo, prompt, limitador=None, reintentos=4, espera_base=1.0):
+    """Llama a la API con reintentos y backoff exponencial ante errores transitorios."""
+    for intento in range(reintentos + 1):
+        if limitador:
+            limitador.esperar_turno()
+        try:
+            return modelo.generate_content(prompt).text
+        except Exception as e:
+            if intento == reintentos or type(e).__name__ not in ERRORES_REINTENTABLES:
+                raise
+            time.sleep(espera_base * 2 ** intento + random.uniform(0, espera_base))
+
+
+def leer_lote(entrada):
+    """Lee pedidos JSONL: objetos con "prompt" (y opcionalmente "id") o strings sueltos.
+
+    Las líneas inválidas no cortan el lote: quedan como ``{"id": n, "error": ...}``
+    (sin "prompt") para que ``procesar_lote`` las informe en la salida.
+    """
+    pedidos = []
+    for numero, linea in enumerate(entrada, start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            registro = json.loads(linea)
+        except ValueError as e:
+            pedidos.append({"id": numero, "error": f"JSON inválido: {e}"})
+            continue
+        if isinstance(registro, str):
+            registro = {"prompt": registro}
+        if not isinstance(registro, dict):
+            pedidos.append({"id": numero, "error": "El pedido debe ser un objeto JSON o un string"})
+            continue
+        registro.setdefault("id", numero)
+        if not isinstance(registro.get("prompt"), str):
+            pedidos.append({"id": registro["id"], "error": 'Falta el campo "prompt" (texto)'})
+            continue
+        pedidos.append(registro)
+    return pedidos
+
+
+def procesar_lote(pedidos, salida, nombre_modelo, cache, concurrencia, por_minuto, reintentos):
+    """Resuelve los pedidos en paralelo y escribe una línea JSONL por cada uno al terminar."""
+
+    def emitir(grupo, **campos):
+        for pedido in grupo:
+            salida.write(json.dumps({"id": pedido["id"], **campos}, ensure_ascii=False) + "\n")
+        salida.flush()
 
-if not API_KEY:
-    print("Error: La variable de entorno GEMINI_API_KEY no fue encontrada.")
-    print("Asegúrate de que tu archivo .env contiene 'GEMINI_API_KEY=tu_clave_de_api'")
-    sys.exit(1)
+    invalidos = [pedido for pedido in pedidos if "prompt" not in pedido]
+    for pedido in invalidos:
+        emitir([pedido], error=pedido["error"])
+    errores = len(invalidos)
 
-genai.configure(api_key=API_KEY)
+    # Prompts repetidos dentro del lote se piden una sola vez.
+    por_clave = {}
+    for pedido in pedidos:
+        if "prompt" not in pedido:
+            continue
+        clave = CacheRespuestas.clave(nombre_modelo, pedido["prompt"])
+        por_clave.setdefault(clave, []).append(pedido)
 
-# Verifica si se proporcionó un texto como argumento
-if len(sys.argv) < 2:
-    print("Por favor, proporciona el texto que quieres enviar a Gemini.")
-    print("Ejemplo: python gemini.py \"¿Cuál es la capital de Francia?\"")
-    sys.exit(1)
+    pendientes = {}
+    for clave, grupo in por_clave.items():
+        respuesta = cache.obtener(clave) if cache else None
+        if respuesta is not None:
+            emitir(grupo, respuesta=respuesta, cache=True)
+        else:
+            pendientes[clave] = grupo
 
-# Une todos los argumentos para formar el prompt completo
-prompt = " ".join(sys.argv[1:])
+    if not pendientes:
+        return errores
 
-try:
-    model = genai.GenerativeModel('gemini-1.5-flash')
-    response = model.generate_content(prompt)
-    print(response.text)
-except Exception as e:
-    print(f"Ha ocurrido un error: {e}")
+    modelo = crear_modelo(nombre_modelo)
+    limitador = LimitadorTasa(por_minuto)
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        futuros = {
+            pool.submit(generar, modelo, grupo[0]["prompt"], limitador, reintentos): clave
+            for clave, grupo in pendientes.items()
+        }
+        for futuro in as_completed(futuros):
+            clave = futuros[futuro]
+            grupo = pendientes[clave]
+            try:
+                respuesta = futuro.result()
+            except Exception as e:
+                errores += len(grupo)
+                emitir(grupo, error=str(e))
+                continue
+            if cache:
+                cache.guardar(clave, nombre_modelo, respuesta)
+            emitir(grupo, respuesta=respuesta, cache=False)
+    return errores
+
+
+def consultar_daemon(prompt, nombre_modelo, usar_cache, espera_inicio=20):
+    """Envía el prompt al daemon residente (iniciándolo si hace falta) e imprime la respuesta.
+
+    Devuelve False si no se pudo hablar con el daemon, para resolver en este proceso.
+    """
+    import gemini_daemon
+
+    try:
+        conexion, token = gemini_daemon.conectar()
+    except PermissionError as e:
+        # Directorio o socket ajeno: no se habla con ese proceso ni se escribe ahí.
+        print(f"Advertencia: no se usa el daemon ({e}).", file=sys.stderr)
+        return False
+    except (OSError, ValueError):
+        try:
+            gemini_daemon.asegurar_directorio()
+        except OSError as e:
+            print(f"Advertencia: no se usa el daemon ({e}).", file=sys.stderr)
+            return False
+        directorio = os.path.dirname(os.path.abspath(__file__))
+        opciones = {"start_new_session": True}
+        if sys.platform.startswith("win"):
+            opciones = {"creationflags": subprocess.DETACHED_PROCESS | subprocess.CREATE_NEW_PROCESS_GROUP}
+        with open(gemini_daemon.ARCHIVO_LOG, "a", encoding="utf-8") as log:
+            proceso = subprocess.Popen(
+                [sys.executable, os.path.join(directorio, "gemini_daemon.py"), "--modelo", nombre_modelo],
+                stdin=subprocess.DEVNULL,
+                stdout=log,
+                stderr=log,
+                **opciones,
+            )
+        limite = time.monotonic() + espera_inicio
+        while True:
+            try:
+                conexion, token = gemini_daemon.conectar()
+                break
+            except (OSError, ValueError):
+                if proceso.poll() is not None or time.monotonic() > limite:
+                    print(
+                        f"Advertencia: no se pudo iniciar el daemon (ver {gemini_daemon.ARCHIVO_LOG}).",
+                        file=sys.stderr,
+                    )
+                    return False
+                time.sleep(0.05)
+
+    recibido = False
+    with conexion:
+        try:
+            gemini_daemon.enviar(
+                conexion,
+                {"token": token, "prompt": prompt, "modelo": nombre_modelo, "usar_cache": usar_cache},
+            )
+            for linea in conexion.makefile("r", encoding="utf-8"):
+                mensaje = json.loads(linea)
+                if "texto" in mensaje:
+                    recibido = True
+                    print(mensaje["texto"], end="", flush=True)
+                elif "error" in mensaje:
+                    print(f"Ha ocurrido un error: {mensaje['error']}")
+                    return True
+                elif mensaje.get("fin"):
+                    print()
+                    return True
+        except OSError:
+            # Conexión reseteada: el daemon murió (por ejemplo, al iniciar sin API key).
+            pass
+
+    # El daemon cerró la conexión sin terminar (por ejemplo, falló al iniciar).
+    if recibido:
+        print()
+        print("Advertencia: el daemon cortó la respuesta.", file=sys.stderr)
+    return recibido
+
+
+def detener_daemon():
+    import gemini_daemon
+
+    try:
+        conexion, token = gemini_daemon.conectar(timeout=5)
+    except (OSError, ValueError):
+        print("El daemon de Gemini no está corriendo.")
+        return
+    with conexion:
+        gemini_daemon.enviar(conexion, {"token": token, "accion": "detener"})
+        conexion.recv(1024)
+    print("Daemon de Gemini detenido.")
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(
+        description="Envía prompts a Gemini, de a uno o en lote (JSONL).",
+        epilog="Ejemplo: python gemini.py \"¿Cuál es la capital de Francia?\"",
+    )
+    parser.add_argument("prompt", nargs="*", help="Texto a enviar (modo de un solo prompt).")
+    parser.add_argument("--batch", metavar="ARCHIVO", help="Archivo JSONL con pedidos, o - para stdin.")
+    parser.add_argument("--salida", metavar="ARCHIVO", help="Archivo JSONL de resultados (por defecto stdout).")
+    parser.add_argument("--modelo", default=MODELO_POR_DEFECTO, help="Modelo a usar (por defecto: %(default)s).")
+    parser.add_argument("--concurrencia", type=int, default=8, help="Pedidos simultáneos en modo lote.")
+    parser.add_argument("--rpm", type=float, default=15, help="Máximo de pedidos por minuto (0 = sin límite).")
+    parser.add_argument("--reintentos", type=int, default=4, help="Reintentos ante errores transitorios.")
+    parser.add_argument("--sin-cache", action="store_true", help="No leer ni escribir la cache de respuestas.")
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        default=os.getenv("GEMINI_DAEMON") == "1",
+        help="Resolver el prompt con el daemon residente, iniciándolo si no corre (o GEMINI_DAEMON=1).",
+    )
+    parser.add_argument("--detener-daemon", action="store_true", help="Detiene el daemon residente.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+
+    if args.detener_daemon:
+        detener_daemon()
+        return
+
+    # El daemon ya cargó el .env y tiene el SDK listo: el cliente sólo reenvía el prompt.
+    if args.daemon and args.prompt and not args.batch:
+        if consultar_daemon(" ".join(args.prompt), args.modelo, not args.sin_cache):
+            return
+
+    # Cargar variables de entorno desde .env
+    load_dotenv()
+
+    cache = None if args.sin_cache else CacheRespuestas()
+
+    if args.batch:
+        if args.batch == "-":
+            pedidos = leer_lote(sys.stdin)
+        else:
+            with open(args.batch, encoding="utf-8") as f:
+                pedidos = leer_lote(f)
+        salida = open(args.salida, "w", encoding="utf-8") if args.salida else sys.stdout
+        try:
+            errores = procesar_lote(
+                pedidos, salida, args.modelo, cache, args.concurrencia, args.rpm, args.reintentos
+            )
+        finally:
+            if salida is not sys.stdout:
+                salida.close()
+        sys.exit(1 if errores else 0)
+
+    # Verifica si se proporcionó un texto como argumento
+    if not args.prompt:
+        print("Por favor, proporciona el texto que quieres enviar a Gemini.")
+        print("Ejemplo: python gemini.py \"¿Cuál es la capital de Francia?\"")
+        sys.exit(1)
+
+    # Une todos los argumentos para formar el prompt completo
+    prompt = " ".join(args.prompt)
+    clave = CacheRespuestas.clave(args.modelo, prompt)
+
+    respuesta = cache.obtener(clave) if cache else None
+    if respuesta is not None:
+        print(respuesta)
+        return
+
+    try:
+        respuesta = generar(crear_modelo(args.modelo), prompt, reintentos=args.reintentos)
+        print(respuesta)
+    except Exception as e:
+        print(f"Ha ocurrido un error: {e}")
+        return
+    if cache:
+        cache.guardar(clave, args.modelo, respuesta)
 
 
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Proceso residente para gemini.py.
+
+Mantiene importado el SDK de Gemini y los modelos ya configurados, y atiende
+pedidos por un socket local (Unix; en Windows, TCP en 127.0.0.1 con token).
+Protocolo: el cliente envía una línea JSON y recibe líneas JSON con
+``{"texto": ...}`` a medida que llegan, terminando en ``{"fin": true}`` o
+``{"error": ...}``. Se cierra solo tras ``--inactividad`` segundos sin uso.
+
+El socket, el log y el archivo de puerto viven en un directorio privado del
+usuario (``$XDG_RUNTIME_DIR/gemini-daemon`` o ``<tmp>/gemini-daemon-<usuario>``
+con permisos 700). El cliente verifica que el directorio y el socket sean del
+usuario antes de conectarse, así otro usuario no puede hacerse pasar por el daemon.
+"""
+
+import argparse
+import getpass
+import json
+import os
+import random
+import secrets
+import socket
+import socketserver
+import stat
+import sys
+import tempfile
+import threading
+import time
+
+from gemini import (
+    ERRORES_REINTENTABLES,
+    MODELO_POR_DEFECTO,
+    CacheRespuestas,
+    crear_modelo,
+    load_dotenv,
+)
+
+INACTIVIDAD_SEGUNDOS = 30 * 60
+USA_UNIX = hasattr(socket, "AF_UNIX")
+
+
+def _directorio_daemon():
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, "gemini-daemon")
+    return os.path.join(tempfile.gettempdir(), f"gemini-daemon-{getpass.getuser()}")
+
+
+DIRECTORIO = _directorio_daemon()
+SOCKET_PATH = os.path.join(DIRECTORIO, "daemon.sock")
+ARCHIVO_PUERTO = os.path.join(DIRECTORIO, "daemon.port")
+ARCHIVO_LOG = os.path.join(DIRECTORIO, "daemon.log")
+
+
+def _es_del_usuario(info):
+    return not hasattr(os, "getuid") or info.st_uid == os.getuid()
+
+
+def asegurar_directorio(crear=True):
+    """Crea (o sólo valida) el directorio privado del daemon.
+
+    PermissionError si existe pero no es un directorio del usuario con
+    permisos 700: en un /tmp compartido otro usuario podría haberlo creado.
+    """
+    if crear:
+        try:
+            os.mkdir(DIRECTORIO, 0o700)
+        except FileExistsError:
+            pass
+    info = os.lstat(DIRECTORIO)
+    if not stat.S_ISDIR(info.st_mode) or not _es_del_usuario(info):
+        raise PermissionError(f"{DIRECTORIO} no es un directorio del usuario actual")
+    if hasattr(os, "getuid") and info.st_mode & 0o077:
+        raise PermissionError(f"{DIRECTORIO} tiene permisos para otros usuarios")
+
+
+def conectar(timeout=None):
+    """Abre una conexión con el daemon y devuelve ``(socket, token)``; OSError si no corre."""
+    asegurar_directorio(crear=False)
+    if USA_UNIX:
+        if not _es_del_usuario(os.lstat(SOCKET_PATH)):
+            raise PermissionError(f"{SOCKET_PATH} pertenece a otro usuario")
+        conexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conexion.settimeout(timeout)
+        try:
+            conexion.connect(SOCKET_PATH)
+        except OSError:
+            conexion.close()
+            raise
+        return conexion, None
+
+    with open(ARCHIVO_PUERTO, encoding="utf-8") as f:
+        puerto, token = f.read().split()
+    return socket.create_connection(("127.0.0.1", int(puerto)), timeout=timeout), token
+
+
+def enviar(conexion, mensaje):
+    conexion.sendall((json.dumps(mensaje, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+class ManejadorPedidos(socketserver.StreamRequestHandler):
+    def responder(self, **campos):
+        self.wfile.write((json.dumps(campos, ensure_ascii=False) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+    def handle(self):
+        servidor = self.server
+        servidor.marcar_uso()
+        try:
+            pedido = json.loads(self.rfile.readline())
+        except ValueError:
+            self.responder(error="Pedido inválido")
+            return
+        if servidor.token and pedido.get("token") != servidor.token:
+            self.responder(error="Token inválido")
+            return
+
+        if pedido.get("accion") == "detener":
+            self.responder(fin=True)
+            threading.Thread(target=servidor.shutdown, daemon=True).start()
+            return
+
+        try:
+            self.responder_prompt(pedido["prompt"], pedido["modelo"], pedido.get("usar_cache", True))
+        except Exception as e:
+            self.responder(error=str(e))
+        finally:
+            servidor.marcar_uso()
+
+    def responder_prompt(self, prompt, nombre_modelo, usar_cache):
+        servidor = self.server
+        clave = CacheRespuestas.clave(nombre_modelo, prompt)
+        if usar_cache:
+            respuesta = servidor.cache.obtener(clave)
+            if respuesta is not None:
+                self.responder(texto=respuesta)
+                self.responder(fin=True)
+                return
+
+        modelo = servidor.modelo(nombre_modelo)
+        partes = []
+        for intento in range(servidor.reintentos + 1):
+            try:
+                for fragmento in modelo.generate_content(prompt, stream=True):
+                    partes.append(fragmento.text)
+                    self.responder(texto=fragmento.text)
+                break
+            except Exception as e:
+                # Sólo se reintenta si todavía no se mandó nada al cliente.
+                if partes or intento == servidor.reintentos or type(e).__name__ not in ERRORES_REINTENTABLES:
+                    raise
+                time.sleep(2 ** intento + random.uniform(0, 1))
+
+        if usar_cache:
+            servidor.cache.guardar(clave, nombre_modelo, "".join(partes))
+        self.responder(fin=True)
+
+
+class _ServidorBase:
+    daemon_threads = True
+
+    def preparar(self, token, inactividad, reintentos):
+        self.token = token
+        self.inactividad = inactividad
+        self.reintentos = reintentos
+        self.cache = CacheRespuestas()
+        self._modelos = {}
+        self._lock_modelos = threading.Lock()
+        self._ultimo_uso = time.monotonic()
+
+    def marcar_uso(self):
+        self._ultimo_uso = time.monotonic()
+
+    def modelo(self, nombre):
+        with self._lock_modelos:
+            if nombre not in self._modelos:
+                self._modelos[nombre] = crear_modelo(nombre)
+            return self._modelos[nombre]
+
+    def vigilar_inactividad(self):
+        while True:
+            time.sleep(min(60, self.inactividad))
+            if time.monotonic() - self._ultimo_uso > self.inactividad:
+                self.shutdown()
+                return
+
+
+if USA_UNIX:
+    class Servidor(_ServidorBase, socketserver.ThreadingUnixStreamServer):
+        pass
+else:
+    class Servidor(_ServidorBase, socketserver.ThreadingTCPServer):
+        pass
+
+
+def crear_servidor():
+    asegurar_directorio()
+    if USA_UNIX:
+        if os.path.exists(SOCKET_PATH):
+            try:
+                conexion, _ = conectar(timeout=1)
+            except OSError:
+                os.unlink(SOCKET_PATH)
+            else:
+                conexion.close()
+                print("El daemon de Gemini ya está corriendo.", file=sys.stderr)
+                sys.exit(1)
+        # El socket no lleva token: se crea ya con permisos 600 (umask) para
+        # que otro usuario no pueda conectarse entre el bind y un chmod.
+        umask_anterior = os.umask(0o077)
+        try:
+            servidor = Servidor(SOCKET_PATH, ManejadorPedidos)
+        finally:
+            os.umask(umask_anterior)
+        return servidor, None
+
+    servidor = Servidor(("127.0.0.1", 0), ManejadorPedidos)
+    token = secrets.token_hex(16)
+    descriptor = os.open(ARCHIVO_PUERTO, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(descriptor, "w", encoding="utf-8") as f:
+        f.write(f"{servidor.server_address[1]} {token}")
+    return servidor, token
+
+
+def parse_arguments():
+    parser = argparse.ArgumentParser(description="Daemon residente para gemini.py.")
+    parser.add_argument(
+        "--modelo",
+        default=MODELO_POR_DEFECTO,
+        help="Modelo a dejar configurado al iniciar (por defecto: %(default)s).",
+    )
+    parser.add_argument(
+        "--inactividad",
+        type=int,
+        default=INACTIVIDAD_SEGUNDOS,
+        help="Segundos sin pedidos tras los cuales el daemon termina (por defecto: %(default)s).",
+    )
+    parser.add_argument("--reintentos", type=int, default=4, help="Reintentos ante errores transitorios.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_arguments()
+    load_dotenv()
+
+    servidor, token = crear_servidor()
+    try:
+        servidor.preparar(token, args.inactividad, args.reintentos)
+        # Importa el SDK y configura el modelo antes de atender el primer pedido.
+        servidor.modelo(args.modelo)
+        threading.Thread(target=servidor.vigilar_inactividad, daemon=True).start()
+        servidor.serve_forever()
+    finally:
+        servidor.server_close()
+        ruta = SOCKET_PATH if USA_UNIX else ARCHIVO_PUERTO
+        if os.path.exists(ruta):
+            os.unlink(ruta)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,373 @@
+#!/usr/bin/env python3
+"""
+Convierte documentos .docx a texto plano.
+
+Características principales:
+    - Parseo incremental de ``word/document.xml`` (iterparse) liberando cada
+      párrafo y fila ya procesados, por lo que la memoria depende del bloque
+      más grande (una tabla entera) y no del tamaño del documento.
+    - Extrae párrafos, tablas (una fila por línea, celdas separadas por " | "),
+      encabezados y pies de página.
+    - Junto a cada ``.txt`` escribe ``.offsets.jsonl`` con la posición (en
+      caracteres) de cada bloque dentro del texto.
+    - Procesa muchos archivos en paralelo con un pool de procesos y omite los
+      que no cambiaron desde la última conversión (por hash SHA-256).
+
+Sin argumentos convierte ``Documentacion.docx`` a ``Documentacion.txt``;
+``--verificar`` comprueba el parseo con documentos de ejemplo.
+"""
+
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import io
+import json
+import os
+import re
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 from xml.etree import ElementTree as ET
 
-path = Path('Documentacion.docx')
-dest = Path('Documentacion.txt')
+W_NS = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+DEFAULT_INPUT = Path("Documentacion.docx")
+MANIFEST_NAME = ".read_docx_manifest.json"
+CELL_SEPARATOR = " | "
+PART_PATTERN = re.compile(r"^word/(header|footer)(\d*)\.xml$")
+PART_LABELS = {"header": "Encabezado", "footer": "Pie de página"}
+
+
+@dataclass
+class Block:
+    part: str
+    kind: str
+    index: int
+    text: str
 
-with zipfile.ZipFile(path) as z:
-    xml = z.read('word/document.xml')
 
-root = ET.fromstring(xml)
-ns = {'w': 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'}
-paragraphs = []
-for para in root.findall('.//w:p', ns):
-    texts = []
-    for elem in para.iter():
+def file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def iter_part_blocks(stream, part: str) -> Iterator[Block]:
+    """Recorre un XML de WordprocessingML y emite párrafos y tablas de nivel superior.
+
+    Cada párrafo o fila ya procesado se vacía y se quita de su padre, también
+    dentro de controles de contenido (``w:sdt``), así el árbol parcial que arma
+    iterparse no crece con el documento.
+    """
+    stack: List[ET.Element] = []
+    paragraph_stack: List[List[str]] = []
+    run_depth = 0
+    table_depth = 0
+    rows: List[str] = []
+    cells: List[str] = []
+    cell_paragraphs: List[str] = []
+    index = 0
+
+    for event, elem in ET.iterparse(stream, events=("start", "end")):
         tag = elem.tag
-        if tag.endswith('}t'):
-            texts.append(elem.text or '')
-        elif tag.endswith('}br') or tag.endswith('}cr'):
-            texts.append('\n')
-    if texts:
-        paragraphs.append(''.join(texts))
-
-text = '\n'.join(paragraphs)
-dest.write_text(text, encoding='utf-8')
+        if event == "start":
+            stack.append(elem)
+            if tag == f"{W_NS}p":
+                paragraph_stack.append([])
+            elif tag == f"{W_NS}r":
+                run_depth += 1
+            elif tag == f"{W_NS}tbl":
+                table_depth += 1
+                if table_depth == 1:
+                    rows = []
+            continue
+
+        stack.pop()
+        done = False
+        if tag == f"{W_NS}r":
+            run_depth -= 1
+        elif tag == f"{W_NS}t":
+            if paragraph_stack:
+                paragraph_stack[-1].append(elem.text or "")
+        elif tag in (f"{W_NS}br", f"{W_NS}cr"):
+            if paragraph_stack and run_depth:
+                paragraph_stack[-1].append("\n")
+        elif tag == f"{W_NS}tab":
+            # Fuera de un run, w:tab es una tabulación definida en w:pPr/w:tabs.
+            if paragraph_stack and run_depth:
+                paragraph_stack[-1].append("\t")
+
+        if tag == f"{W_NS}p":
+            texts = paragraph_stack.pop()
+            if table_depth:
+                cell_paragraphs.append("".join(texts))
+            elif texts:
+                yield Block(part, "parrafo", index, "".join(texts))
+                index += 1
+            done = not table_depth and not paragraph_stack
+        elif tag == f"{W_NS}tc" and table_depth == 1:
+            cells.append(" ".join(p for p in cell_paragraphs if p).replace("\n", " "))
+            cell_paragraphs = []
+        elif tag == f"{W_NS}tr" and table_depth == 1:
+            rows.append(CELL_SEPARATOR.join(cells))
+            cells = []
+            done = True
+        elif tag == f"{W_NS}tbl":
+            table_depth -= 1
+            if table_depth == 0:
+                if rows:
+                    yield Block(part, "tabla", index, "\n".join(rows))
+                    index += 1
+                done = True
+
+        if done:
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+
+
+# Casos de ``--verificar``: cuerpo de document.xml y bloques esperados.
+VERIFICATION_CASES: List[Tuple[str, str, List[str]]] = [
+    (
+        "tabulaciones de párrafo",
+        '<w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/><w:tab w:val="left" w:pos="1440"/>'
+        "</w:tabs></w:pPr><w:r><w:t>Hola</w:t></w:r></w:p>"
+        '<w:p><w:pPr><w:tabs><w:tab w:val="left" w:pos="720"/></w:tabs></w:pPr></w:p>',
+        ["Hola"],
+    ),
+    (
+        "tabulación y salto en el run",
+        "<w:p><w:r><w:t>a</w:t><w:tab/><w:t>b</w:t><w:br/><w:t>c</w:t></w:r></w:p>",
+        ["a\tb\nc"],
+    ),
+    (
+        "control de contenido y tabla",
+        "<w:sdt><w:sdtContent><w:p><w:r><w:t>Dentro</w:t></w:r></w:p></w:sdtContent></w:sdt>"
+        "<w:tbl><w:tr><w:tc><w:p><w:r><w:t>x</w:t></w:r></w:p></w:tc>"
+        "<w:tc><w:p><w:r><w:t>y</w:t></w:r></w:p></w:tc></w:tr></w:tbl>",
+        ["Dentro", "x | y"],
+    ),
+]
+
+
+def _part_info(name: str) -> Tuple[str, int]:
+    match = PART_PATTERN.match(name)
+    assert match
+    return match.group(1), int(match.group(2) or 0)
+
+
+def _part_sort_key(name: str) -> Tuple[int, int]:
+    kind, number = _part_info(name)
+    return (0 if kind == "header" else 1), number
+
+
+def iter_document_blocks(archive: zipfile.ZipFile) -> Iterator[Tuple[Optional[str], Block]]:
+    """Emite los bloques del cuerpo y luego los de encabezados y pies de página.
+
+    El primer elemento de cada tupla es el título de la sección, sólo en el
+    primer bloque de cada encabezado o pie.
+    """
+    with archive.open("word/document.xml") as stream:
+        for block in iter_part_blocks(stream, "document"):
+            yield None, block
+
+    extra_parts = sorted(
+        (name for name in archive.namelist() if PART_PATTERN.match(name)),
+        key=_part_sort_key,
+    )
+    for name in extra_parts:
+        kind, number = _part_info(name)
+        part = Path(name).stem
+        title: Optional[str] = f"[{PART_LABELS[kind]} {number or 1}]"
+        with archive.open(name) as stream:
+            for block in iter_part_blocks(stream, part):
+                yield title, block
+                title = None
+
+
+def failed_checks() -> List[str]:
+    """Corre ``VERIFICATION_CASES`` y devuelve la descripción de los que fallan."""
+    failures = []
+    for name, body, expected in VERIFICATION_CASES:
+        xml = f'<w:document xmlns:w="{W_NS[1:-1]}"><w:body>{body}</w:body></w:document>'
+        texts = [block.text for block in iter_part_blocks(io.BytesIO(xml.encode("utf-8")), "document")]
+        if texts != expected:
+            failures.append(f"{name}: se esperaba {expected!r} y se obtuvo {texts!r}")
+    return failures
+
+
+def convert(source: Path, target: Path) -> int:
+    """Convierte ``source`` a ``target`` (+ ``.offsets.jsonl``) y devuelve la cantidad de bloques."""
+    offsets_path = target.with_suffix(".offsets.jsonl")
+    tmp_target = target.with_name(target.name + ".tmp")
+    tmp_offsets = offsets_path.with_name(offsets_path.name + ".tmp")
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    offset = 0
+    count = 0
+    with zipfile.ZipFile(source) as archive, \
+            tmp_target.open("w", encoding="utf-8", newline="") as text_out, \
+            tmp_offsets.open("w", encoding="utf-8") as offsets_out:
+        for title, block in iter_document_blocks(archive):
+            prefix = "\n" if count else ""
+            if title:
+                prefix += f"{title}\n" if not count else f"\n{title}\n"
+            text_out.write(prefix)
+            offset += len(prefix)
+            text_out.write(block.text)
+            offsets_out.write(
+                json.dumps(
+                    {
+                        "parte": block.part,
+                        "tipo": block.kind,
+                        "indice": block.index,
+                        "offset": offset,
+                        "longitud": len(block.text),
+                    },
+                    ensure_ascii=False,
+                )
+                + "\n"
+            )
+            offset += len(block.text)
+            count += 1
+
+    os.replace(tmp_target, target)
+    os.replace(tmp_offsets, offsets_path)
+    return count
+
+
+def convert_if_changed(source: Path, target: Path, known_hash: Optional[str]) -> Tuple[str, str, int]:
+    """Tarea del pool: devuelve ``(estado, hash, bloques)``."""
+    digest = file_hash(source)
+    if digest == known_hash and target.exists():
+        return "omitido", digest, 0
+    return "convertido", digest, convert(source, target)
+
+
+def expand_inputs(patterns: Sequence[str]) -> List[Path]:
+    """Acepta archivos, directorios (búsqueda recursiva de .docx) y globs."""
+    found: Dict[Path, None] = {}
+    for pattern in patterns:
+        path = Path(pattern)
+        if path.is_dir():
+            matches = sorted(path.rglob("*.docx"))
+        else:
+            matches = sorted(Path(match) for match in glob.glob(pattern, recursive=True))
+        for match in matches:
+            # Los archivos de bloqueo de Word (~$nombre.docx) no son documentos.
+            if match.is_file() and not match.name.startswith("~$"):
+                found[match.resolve()] = None
+    return list(found)
+
+
+def load_manifest(path: Path) -> Dict[str, str]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def parse_arguments() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Convierte documentos .docx a texto plano.")
+    parser.add_argument(
+        "entradas",
+        nargs="*",
+        default=[str(DEFAULT_INPUT)],
+        help="Archivos .docx, directorios o globs (por defecto: %(default)s).",
+    )
+    parser.add_argument(
+        "--destino",
+        type=Path,
+        default=None,
+        help="Directorio de salida; por defecto cada .txt queda junto a su .docx.",
+    )
+    parser.add_argument(
+        "--procesos",
+        type=int,
+        default=None,
+        help="Cantidad de procesos en paralelo (por defecto: núcleos disponibles).",
+    )
+    parser.add_argument(
+        "--forzar",
+        action="store_true",
+        help="Convierte aunque el archivo no haya cambiado.",
+    )
+    parser.add_argument(
+        "--verificar",
+        action="store_true",
+        help="Comprueba el parseo con documentos de ejemplo y termina.",
+    )
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_arguments()
+    if args.verificar:
+        failures = failed_checks()
+        for failure in failures:
+            print(f"error: {failure}")
+        print(f"{len(VERIFICATION_CASES) - len(failures)}/{len(VERIFICATION_CASES)} casos correctos")
+        if failures:
+            raise SystemExit(1)
+        return
+
+    sources = expand_inputs(args.entradas)
+    if not sources:
+        print("No se encontraron archivos .docx para convertir.")
+        return
+
+    jobs: List[Tuple[Path, Path, Path]] = []
+    manifests: Dict[Path, Dict[str, str]] = {}
+    for source in sources:
+        target_dir = args.destino or source.parent
+        manifest_path = target_dir / MANIFEST_NAME
+        if manifest_path not in manifests:
+            manifests[manifest_path] = load_manifest(manifest_path)
+        jobs.append((source, target_dir / f"{source.stem}.txt", manifest_path))
+
+    def record(source: Path, manifest_path: Path, result: Tuple[str, str, int]) -> None:
+        status, digest, blocks = result
+        manifests[manifest_path][str(source)] = digest
+        detail = f" ({blocks} bloques)" if status == "convertido" else ""
+        print(f"{status}: {source.name}{detail}")
+
+    def known(source: Path, manifest_path: Path) -> Optional[str]:
+        return None if args.forzar else manifests[manifest_path].get(str(source))
+
+    errors = 0
+    if len(jobs) == 1 or args.procesos == 1:
+        for source, target, manifest_path in jobs:
+            try:
+                record(source, manifest_path, convert_if_changed(source, target, known(source, manifest_path)))
+            except Exception as exc:
+                errors += 1
+                print(f"error: {source.name}: {exc}")
+    else:
+        with ProcessPoolExecutor(max_workers=args.procesos) as pool:
+            futures = {
+                pool.submit(convert_if_changed, source, target, known(source, manifest_path)): (source, manifest_path)
+                for source, target, manifest_path in jobs
+            }
+            for future in as_completed(futures):
+                source, manifest_path = futures[future]
+                try:
+                    record(source, manifest_path, future.result())
+                except Exception as exc:
+                    errors += 1
+                    print(f"error: {source.name}: {exc}")
+
+    for manifest_path, manifest in manifests.items():
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    if errors:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
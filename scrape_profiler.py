@@ -0,0 +1,341 @@
+"""
+Perfilado del scraper (``scrape_senasa.py --profile DIR``).
+
+Pensado para dejarlo activo en corridas reales, con un costo de unos pocos
+microsegundos por comando y un hilo de muestreo a baja frecuencia:
+
+    - ``muestras.folded``: perfil por muestreo del hilo principal (pilas
+      plegadas, una por línea con su cantidad de muestras), compatible con
+      flamegraph.pl y speedscope. Al ser de reloj de pared incluye el tiempo
+      bloqueado esperando al navegador.
+    - ``comandos.csv``: cantidad, errores y latencia de cada comando del
+      WebDriver (o de DevTools con ``--driver cdp``) agrupados por el método
+      de ``SenasaScraper`` que lo emitió.
+    - ``traza.json``: traza en formato Chrome Trace Event (se abre con
+      chrome://tracing o https://ui.perfetto.dev) con un tramo por página,
+      por producto y por comando, cada uno con el producto y la página como
+      contexto. Se escribe a medida que avanza, así que sirve aunque la
+      corrida se corte.
+
+En corridas largas (``--watch``) ``checkpoint`` reescribe los resúmenes y
+rota la traza en ``traza-NNNN.json`` al final de cada ciclo, conservando sólo
+las últimas ``max_trace_files``.
+"""
+
+from __future__ import annotations
+
+import csv
+import functools
+import inspect
+import json
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from types import CodeType, FrameType
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+DEFAULT_SAMPLE_INTERVAL = 0.01
+DEFAULT_MAX_TRACE_FILES = 24
+MAX_STACK_DEPTH = 64
+BUCKETS_PER_OCTAVE = 4
+
+SUMMARY_FIELDS = [
+    "metodo",
+    "comando",
+    "cantidad",
+    "errores",
+    "total_ms",
+    "media_ms",
+    "p50_ms",
+    "p95_ms",
+    "max_ms",
+]
+
+
+class _Latencies:
+    """Contador de latencias con histograma logarítmico (memoria constante)."""
+
+    __slots__ = ("count", "errors", "total", "maximum", "buckets")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.buckets: Counter = Counter()
+
+    def add(self, seconds: float, failed: bool) -> None:
+        self.count += 1
+        self.errors += failed
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+        micros = max(seconds * 1e6, 1.0)
+        self.buckets[math.ceil(math.log2(micros) * BUCKETS_PER_OCTAVE)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Cota superior (en segundos) del balde que contiene el percentil pedido."""
+        threshold = fraction * self.count
+        seen = 0
+        for bucket in sorted(self.buckets):
+            seen += self.buckets[bucket]
+            if seen >= threshold:
+                return min(2 ** (bucket / BUCKETS_PER_OCTAVE) / 1e6, self.maximum)
+        return self.maximum
+
+
+class ScrapeProfiler:
+    """Junta muestras, estadísticas de comandos y la traza de una corrida."""
+
+    def __init__(
+        self,
+        directory: Path,
+        owner: type,
+        sample_interval: float = DEFAULT_SAMPLE_INTERVAL,
+        max_trace_files: int = DEFAULT_MAX_TRACE_FILES,
+    ) -> None:
+        self.directory = directory
+        self.sample_interval = sample_interval
+        self.max_trace_files = max_trace_files
+        self._owner_codes: Set[CodeType] = {
+            member.__code__ for member in vars(owner).values() if inspect.isfunction(member)
+        }
+        self._commands: Dict[Tuple[str, str], _Latencies] = defaultdict(_Latencies)
+        self._samples: Counter = Counter()
+        self._context: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._target_thread = 0
+        self._trace_file = None
+        self._trace_empty = True
+        self._trace_index = 0
+        self._origin = 0.0
+        self._pid = os.getpid()
+
+    # --------------------------------------------------------------------- #
+    # Ciclo de vida
+    # --------------------------------------------------------------------- #
+    def start(self) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._origin = time.perf_counter()
+        self._target_thread = threading.get_ident()
+        with self._lock:
+            self._open_trace()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample_loop, name="profiler-sampler", daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> None:
+        if self._trace_file is None:
+            return
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+        with self._lock:
+            self._close_trace()
+        self._write_samples()
+        self._write_summary()
+
+    def checkpoint(self, rotate: bool = False) -> None:
+        """Escribe los resúmenes acumulados hasta ahora y, con ``rotate``, empieza otra traza."""
+        if self._trace_file is None:
+            return
+        with self._lock:
+            if rotate:
+                self._close_trace()
+                self._trace_index += 1
+                self._open_trace()
+                expired = self._trace_path(self._trace_index - self.max_trace_files)
+                if self._trace_index >= self.max_trace_files and expired.exists():
+                    expired.unlink()
+            else:
+                self._trace_file.flush()
+        self._write_samples()
+        self._write_summary()
+
+    def _trace_path(self, index: int) -> Path:
+        return self.directory / ("traza.json" if index == 0 else f"traza-{index:04d}.json")
+
+    def _open_trace(self) -> None:
+        self._trace_file = self._trace_path(self._trace_index).open("w", encoding="utf-8")
+        self._trace_file.write("[")
+        self._trace_empty = True
+        event = {"ph": "M", "name": "process_name", "args": {"name": "scrape_senasa"}}
+        event.update(pid=self._pid, tid=self._target_thread)
+        self._trace_file.write("\n" + json.dumps(event))
+        self._trace_empty = False
+
+    def _close_trace(self) -> None:
+        self._trace_file.write("\n]\n")
+        self._trace_file.close()
+        self._trace_file = None
+
+    # --------------------------------------------------------------------- #
+    # Instrumentación del driver
+    # --------------------------------------------------------------------- #
+    def instrument(self, driver: Any) -> None:
+        """Envuelve el punto por el que pasan todos los comandos del driver.
+
+        Con Selenium es ``WebDriver.execute`` (los elementos también lo usan a
+        través de su ``_parent``); con ``CdpDriver`` son ``call`` y
+        ``call_many`` de la conexión DevTools.
+        """
+        connection = getattr(driver, "_connection", None)
+        if connection is not None:
+            connection.call = self._wrap(connection.call, lambda method, *_, **__: method)
+            connection.call_many = self._wrap(
+                connection.call_many,
+                lambda commands, *_, **__: f"{commands[0][0]} x{len(commands)}" if commands else "vacío",
+            )
+        else:
+            driver.execute = self._wrap(driver.execute, lambda command, *_, **__: str(command))
+
+    def _wrap(self, function: Callable[..., Any], command_name: Callable[..., str]) -> Callable[..., Any]:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            failed = True
+            try:
+                result = function(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                duration = time.perf_counter() - start
+                self._record_command(command_name(*args, **kwargs), start, duration, failed)
+
+        return wrapper
+
+    def _issuing_method(self) -> str:
+        frame: Optional[FrameType] = sys._getframe(3)
+        while frame is not None:
+            if frame.f_code in self._owner_codes:
+                return frame.f_code.co_name
+            frame = frame.f_back
+        return "(fuera del scraper)"
+
+    def _record_command(self, command: str, start: float, duration: float, failed: bool) -> None:
+        method = self._issuing_method()
+        with self._lock:
+            self._commands[(method, command)].add(duration, failed)
+        args = dict(self._context, metodo=method)
+        if failed:
+            args["error"] = True
+        self._emit_complete(command, "webdriver", start, duration, args)
+
+    # --------------------------------------------------------------------- #
+    # Tramos con contexto
+    # --------------------------------------------------------------------- #
+    @contextmanager
+    def span(self, name: str, **context: Any) -> Iterator[None]:
+        """Registra un tramo de la traza y agrega ``context`` a todo lo que ocurra dentro."""
+        previous = self._context
+        self._context = dict(previous, **context)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._emit_complete(name, "scraper", start, time.perf_counter() - start, self._context)
+            self._context = previous
+            if not previous and self._trace_file is not None:
+                with self._lock:
+                    self._trace_file.flush()
+
+    def _emit_complete(self, name: str, category: str, start: float, duration: float, args: Dict[str, Any]) -> None:
+        self._emit(
+            {
+                "ph": "X",
+                "name": name,
+                "cat": category,
+                "ts": round((start - self._origin) * 1e6, 1),
+                "dur": round(duration * 1e6, 1),
+                "args": args,
+            }
+        )
+
+    def _emit(self, event: Dict[str, Any]) -> None:
+        event.update(pid=self._pid, tid=threading.get_ident())
+        line = json.dumps(event, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._trace_file is None:
+                return
+            self._trace_file.write("\n" if self._trace_empty else ",\n")
+            self._trace_file.write(line)
+            self._trace_empty = False
+
+    # --------------------------------------------------------------------- #
+    # Muestreo
+    # --------------------------------------------------------------------- #
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._target_thread)
+            stack: List[CodeType] = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if stack:
+                with self._lock:
+                    self._samples[tuple(reversed(stack))] += 1
+
+    @staticmethod
+    def _frame_label(code: CodeType) -> str:
+        return f"{Path(code.co_filename).stem}:{code.co_name}"
+
+    def _snapshot_samples(self) -> Counter:
+        with self._lock:
+            return Counter(self._samples)
+
+    def _write_samples(self) -> None:
+        # Se escribe aparte y se reemplaza, para que quien lea el archivo a
+        # mitad de una corrida con --watch nunca lo vea incompleto.
+        target = self.directory / "muestras.folded"
+        temporary = target.with_name(target.name + ".tmp")
+        with temporary.open("w", encoding="utf-8") as folded:
+            for stack, count in self._snapshot_samples().most_common():
+                folded.write(";".join(self._frame_label(code) for code in stack) + f" {count}\n")
+        os.replace(temporary, target)
+
+    def top_functions(self, limit: int = 10) -> List[Tuple[str, float]]:
+        """Funciones con más muestras propias (hoja de la pila), como fracción del total."""
+        samples = self._snapshot_samples()
+        total = sum(samples.values())
+        if not total:
+            return []
+        leaves: Counter = Counter()
+        for stack, count in samples.items():
+            leaves[self._frame_label(stack[-1])] += count
+        return [(label, count / total) for label, count in leaves.most_common(limit)]
+
+    def _write_summary(self) -> None:
+        with self._lock:
+            rows = sorted(self._commands.items(), key=lambda item: item[1].total, reverse=True)
+        target = self.directory / "comandos.csv"
+        temporary = target.with_name(target.name + ".tmp")
+        with temporary.open("w", encoding="utf-8-sig", newline="") as csv_file:
+            writer = csv.DictWriter(csv_file, fieldnames=SUMMARY_FIELDS, delimiter=";")
+            writer.writeheader()
+            for (method, command), stats in rows:
+                writer.writerow(
+                    {
+                        "metodo": method,
+                        "comando": command,
+                        "cantidad": stats.count,
+                        "errores": stats.errors,
+                        "total_ms": f"{stats.total * 1e3:.1f}",
+                        "media_ms": f"{stats.total / stats.count * 1e3:.2f}",
+                        "p50_ms": f"{stats.percentile(0.5) * 1e3:.2f}",
+                        "p95_ms": f"{stats.percentile(0.95) * 1e3:.2f}",
+                        "max_ms": f"{stats.maximum * 1e3:.2f}",
+                    }
+                )
+        os.replace(temporary, target)
+
+    def command_totals(self, limit: int = 10) -> List[Tuple[str, str, int, float]]:
+        """``(metodo, comando, cantidad, segundos)`` de los comandos que más tiempo sumaron."""
+        with self._lock:
+            rows = sorted(self._commands.items(), key=lambda item: item[1].total, reverse=True)
+        return [(method, command, stats.count, stats.total) for (method, command), stats in rows[:limit]]
@@ -9,22 +9,33 @@ Características principales:
     - Evita volver a procesar productos ya conocidos (por número de registro).
     - Usa esperas explícitas en lugar de sleeps arbitrarios siempre que es posible.
     - Permite exportar únicamente los productos nuevos detectados.
+    - Backend opcional por DevTools (``--driver cdp``) que evita el salto HTTP
+      a chromedriver y reacciona a eventos de la página (ver ``cdp_driver.py``).
+    - Modo ``--watch``: mantiene el navegador abierto, revisa periódicamente
+      las primeras páginas del listado y publica cada producto nuevo en un
+      feed JSONL de sólo agregado que otros procesos pueden seguir.
+    - ``--profile DIR``: muestreo del lado Python, latencia de cada comando del
+      navegador por método y traza por página/producto (ver ``scrape_profiler.py``).
 """
 
 from __future__ import annotations
 
 import argparse
 import csv
+import json
+import os
 import re
 import time
+from contextlib import nullcontext
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+from typing import TYPE_CHECKING, Any, Callable, ContextManager, Dict, Iterable, List, Optional, Sequence, Set, Tuple
 
 from selenium import webdriver
 from selenium.common.exceptions import (
     NoSuchElementException,
     TimeoutException,
+    WebDriverException,
 )
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.common.by import By
@@ -32,10 +43,15 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from webdriver_manager.chrome import ChromeDriverManager
 
+if TYPE_CHECKING:
+    from scrape_profiler import ScrapeProfiler
+
 
 BASE_URL = "https://aps2.senasa.gov.ar/vademecum/app/publico/formulados"
 DEFAULT_OUTPUT = "productos_senasa_nuevos.csv"
 DEFAULT_EXISTING = "productos_senasa_seguro.csv"
+DEFAULT_CHANGE_FEED = "productos_senasa_cambios.jsonl"
+DRIVER_BACKENDS = ("selenium", "cdp")
 
 LOG_SYMBOLS: Dict[str, str] = {
     "INFO": "[i]",
@@ -93,29 +109,72 @@ def load_known_registros(files: Sequence[Path]) -> Set[str]:
     return registros
 
 
-def write_csv(path: Path, records: Iterable["ProductRecord"]) -> None:
-    """Escribe el listado de productos nuevos a disco."""
+CSV_FIELDNAMES = [
+    "numero_registro",
+    "marca",
+    "activos",
+    "banda_tox",
+    "aptitudes",
+    "presentacion",
+]
+
+
+def write_csv(path: Path, records: Iterable["ProductRecord"], append: bool = False) -> None:
+    """Escribe el listado de productos nuevos a disco.
+
+    Con ``append`` agrega filas al final y sólo escribe el encabezado si el
+    archivo no existía o estaba vacío.
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
-    fieldnames = [
-        "numero_registro",
-        "marca",
-        "activos",
-        "banda_tox",
-        "aptitudes",
-        "presentacion",
-    ]
-    with path.open("w", encoding="utf-8-sig", newline="") as csv_file:
+    write_header = not append or not path.exists() or path.stat().st_size == 0
+    with path.open("a" if append else "w", encoding="utf-8-sig", newline="") as csv_file:
         writer = csv.DictWriter(
             csv_file,
-            fieldnames=fieldnames,
+            fieldnames=CSV_FIELDNAMES,
             delimiter=";",
             quoting=csv.QUOTE_ALL,
         )
-        writer.writeheader()
+        if write_header:
+            writer.writeheader()
         for record in records:
             writer.writerow(record.as_dict())
 
 
+class ChangeFeed:
+    """Feed JSONL de sólo agregado con los productos nuevos detectados.
+
+    Cada línea es un evento completo (``seq``, ``ts``, ``tipo``, ``origen`` y
+    ``producto``) y se sincroniza a disco antes de continuar, de modo que un
+    importador que siga el archivo (``tail -f`` o guardando el último ``seq``
+    procesado) nunca lee una línea a medias ni pierde eventos ya publicados.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.seq = self._last_seq()
+
+    def _last_seq(self) -> int:
+        if not self.path.exists():
+            return 0
+        with self.path.open("rb") as feed_file:
+            return sum(1 for line in feed_file if line.strip())
+
+    def publish(self, record: "ProductRecord", origen: str) -> None:
+        self.seq += 1
+        event = {
+            "seq": self.seq,
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "tipo": "nuevo",
+            "origen": origen,
+            "producto": record.as_dict(),
+        }
+        with self.path.open("a", encoding="utf-8", newline="\n") as feed_file:
+            feed_file.write(json.dumps(event, ensure_ascii=False) + "\n")
+            feed_file.flush()
+            os.fsync(feed_file.fileno())
+
+
 @dataclass
 class ProductSummary:
     numero_registro: str
@@ -149,14 +208,22 @@ class SenasaScraper:
         retry_attempts: int = 2,
         page_load_timeout: int = 120,
         command_timeout: int = 180,
+        backend: str = "selenium",
+        chrome_binary: Optional[str] = None,
+        profiler: Optional["ScrapeProfiler"] = None,
     ) -> None:
+        if backend not in DRIVER_BACKENDS:
+            raise ValueError(f"Backend de driver desconocido: {backend}")
         self.headless = headless
         self.wait_timeout = wait_timeout
         self.click_delay = click_delay
         self.retry_attempts = retry_attempts
         self.page_load_timeout = page_load_timeout
         self.command_timeout = command_timeout
-        self.driver: Optional[webdriver.Chrome] = None
+        self.backend = backend
+        self.chrome_binary = chrome_binary
+        self.profiler = profiler
+        self.driver: Optional[Any] = None
         self.wait: Optional[WebDriverWait] = None
         self.stats: Dict[str, int] = {
             "success": 0,
@@ -169,7 +236,15 @@ class SenasaScraper:
     # Context manager helpers
     # --------------------------------------------------------------------- #
     def __enter__(self) -> "SenasaScraper":
+        return self.start()
+
+    def __exit__(self, exc_type, exc, exc_tb) -> None:
+        self.stop()
+
+    def start(self) -> "SenasaScraper":
         self.driver = self._build_driver()
+        if self.profiler:
+            self.profiler.instrument(self.driver)
         if self.command_timeout:
             try:
                 self.driver.command_executor.set_timeout(self.command_timeout)
@@ -180,30 +255,84 @@ class SenasaScraper:
                 self.driver.set_page_load_timeout(self.page_load_timeout)
             except Exception:
                 pass
-        self.wait = WebDriverWait(self.driver, self.wait_timeout)
+        # Con CDP cada consulta cuesta poco, así que se puede sondear más seguido.
+        poll_frequency = 0.05 if self.backend == "cdp" else 0.5
+        self.wait = WebDriverWait(self.driver, self.wait_timeout, poll_frequency=poll_frequency)
         return self
 
-    def __exit__(self, exc_type, exc, exc_tb) -> None:
-        if self.driver:
-            self.driver.quit()
+    def stop(self) -> None:
+        driver, self.driver, self.wait = self.driver, None, None
+        if driver:
+            try:
+                driver.quit()
+            except Exception as exc:
+                log_progress(f"No se pudo cerrar el navegador limpiamente: {exc}", "WARNING")
+
+    def _chrome_arguments(self) -> List[str]:
+        arguments = [
+            "--disable-blink-features=AutomationControlled",
+            "--disable-extensions",
+            "--disable-gpu",
+            "--no-sandbox",
+            "--disable-dev-shm-usage",
+            "--start-maximized",
+            "--remote-allow-origins=*",
+        ]
+        if self.headless:
+            arguments.insert(0, "--headless=new")
+        return arguments
+
+    def _build_driver(self) -> Any:
+        if self.backend == "cdp":
+            from cdp_driver import CdpDriver
+
+            return CdpDriver(
+                arguments=self._chrome_arguments(),
+                binary=self.chrome_binary,
+                command_timeout=self.command_timeout,
+                page_load_timeout=self.page_load_timeout,
+            )
 
-    def _build_driver(self) -> webdriver.Chrome:
         options = webdriver.ChromeOptions()
-        if self.headless:
-            options.add_argument("--headless=new")
-        options.add_argument("--disable-blink-features=AutomationControlled")
-        options.add_argument("--disable-extensions")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--start-maximized")
+        for argument in self._chrome_arguments():
+            options.add_argument(argument)
         options.add_experimental_option("excludeSwitches", ["enable-automation"])
         options.add_experimental_option("useAutomationExtension", False)
-        options.add_argument("--remote-allow-origins=*")
 
         service = Service(ChromeDriverManager().install())
         return webdriver.Chrome(service=service, options=options)
 
+    def _settle(self) -> None:
+        """Espera a que la UI reaccione a un click.
+
+        El backend CDP devuelve apenas el DOM deja de cambiar; con Selenium se
+        mantiene el retraso fijo configurado.
+        """
+        wait_for_dom_settle = getattr(self.driver, "wait_for_dom_settle", None)
+        if wait_for_dom_settle is None:
+            time.sleep(self.click_delay)
+        else:
+            wait_for_dom_settle(self.click_delay)
+
+    def _span(self, name: str, **context: Any) -> ContextManager[None]:
+        """Tramo de la traza de ``--profile``; no hace nada si no se está perfilando."""
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.span(name, **context)
+
+    def _release_page_objects(self) -> None:
+        """Con el backend CDP libera los handles de elementos de la página ya procesada."""
+        release_objects = getattr(self.driver, "release_objects", None)
+        if release_objects is not None:
+            release_objects()
+
+    def _texts(self, elements: Sequence[Any]) -> List[str]:
+        """Lee el texto de varios elementos, en un solo viaje si el driver lo permite."""
+        batch_texts = getattr(self.driver, "texts", None)
+        if batch_texts is not None:
+            return batch_texts(elements)
+        return [element.text for element in elements]
+
     # --------------------------------------------------------------------- #
     # Navegación principal
     # --------------------------------------------------------------------- #
@@ -228,7 +357,14 @@ class SenasaScraper:
         self,
         known_registros: Set[str],
         max_pages: Optional[int] = None,
+        on_product: Optional[Callable[[ProductRecord], None]] = None,
     ) -> List[ProductRecord]:
+        """Recorre el listado y devuelve los productos no incluidos en ``known_registros``.
+
+        ``on_product`` se invoca con cada producto nuevo apenas se extrae, antes
+        de marcarlo como conocido, para que un corte a mitad del recorrido no
+        pierda lo ya procesado.
+        """
         assert self.driver
 
         self.navigate_to_listing()
@@ -237,45 +373,50 @@ class SenasaScraper:
         page_number = 1
 
         while True:
-            try:
-                summaries = self._collect_page_products()
-            except TimeoutException:
-                log_progress("No se pudo cargar la tabla de la página actual", "WARNING")
-                break
+            with self._span("pagina", pagina=page_number):
+                try:
+                    summaries = self._collect_page_products()
+                except TimeoutException:
+                    log_progress("No se pudo cargar la tabla de la página actual", "WARNING")
+                    break
 
-            if not summaries:
-                log_progress("La página no contenía filas, deteniendo scraping", "WARNING")
-                break
+                if not summaries:
+                    log_progress("La página no contenía filas, deteniendo scraping", "WARNING")
+                    break
 
-            log_progress(
-                f"Procesando página {page_number} con {len(summaries)} filas",
-                "PROGRESS",
-            )
+                log_progress(
+                    f"Procesando página {page_number} con {len(summaries)} filas",
+                    "PROGRESS",
+                )
 
-            for summary in summaries:
-                registro = normalize_registro(summary.numero_registro)
-                if not registro:
-                    continue
+                for summary in summaries:
+                    registro = normalize_registro(summary.numero_registro)
+                    if not registro:
+                        continue
 
-                if registro in known_registros:
-                    self.stats["skipped"] += 1
-                    continue
+                    if registro in known_registros:
+                        self.stats["skipped"] += 1
+                        continue
 
-                if registro in processed_this_run:
-                    self.stats["skipped"] += 1
-                    continue
+                    if registro in processed_this_run:
+                        self.stats["skipped"] += 1
+                        continue
 
-                record = self._process_product(summary)
-                new_products.append(record)
-                known_registros.add(registro)
-                processed_this_run.add(registro)
+                    record = self._process_product(summary)
+                    if on_product is not None:
+                        on_product(record)
+                    new_products.append(record)
+                    known_registros.add(registro)
+                    processed_this_run.add(registro)
 
-            if max_pages and page_number >= max_pages:
-                log_progress("Se alcanzó el límite de páginas solicitado", "INFO")
-                break
+                self._release_page_objects()
 
-            if not self._go_to_next_page():
-                break
+                if max_pages and page_number >= max_pages:
+                    log_progress("Se alcanzó el límite de páginas solicitado", "INFO")
+                    break
+
+                if not self._go_to_next_page():
+                    break
 
             page_number += 1
 
@@ -291,10 +432,11 @@ class SenasaScraper:
             cells = row.find_elements(By.TAG_NAME, "td")
             if len(cells) < 5:
                 continue
-            numero_registro = normalize_registro(cells[0].text)
-            marca = cells[1].text.strip()
-            activos = cells[3].text.strip()
-            banda_tox = cells[4].text.strip()
+            texts = self._texts(cells[:5])
+            numero_registro = normalize_registro(texts[0])
+            marca = texts[1].strip()
+            activos = texts[3].strip()
+            banda_tox = texts[4].strip()
 
             if numero_registro:
                 summaries.append(
@@ -312,6 +454,10 @@ class SenasaScraper:
     # Procesamiento individual de productos
     # --------------------------------------------------------------------- #
     def _process_product(self, summary: ProductSummary) -> ProductRecord:
+        with self._span("producto", producto=summary.numero_registro, marca=summary.marca):
+            return self._process_product_with_retries(summary)
+
+    def _process_product_with_retries(self, summary: ProductSummary) -> ProductRecord:
         last_error: Optional[Exception] = None
 
         for attempt in range(1, self.retry_attempts + 1):
@@ -363,7 +509,7 @@ class SenasaScraper:
 
         handles_before = self.driver.window_handles[:]
         self.driver.execute_script("arguments[0].click();", detail_button)
-        time.sleep(self.click_delay)
+        self._settle()
 
         opened_new_tab = self._switch_to_new_tab(handles_before)
 
@@ -463,7 +609,7 @@ class SenasaScraper:
                 self.driver.switch_to.window(handles_before[0])
             else:
                 self.driver.back()
-                time.sleep(self.click_delay)
+                self._settle()
 
         self._wait_for_table()
 
@@ -522,15 +668,27 @@ class SenasaScraper:
             except Exception:
                 pass
 
+            # La sección se completa por XHR: se le da al menos ``click_delay``
+            # antes de probar el siguiente selector, que podría volver a plegarla.
+            deadline = time.monotonic() + self.click_delay
             self.driver.execute_script("arguments[0].click();", element)
-            time.sleep(self.click_delay)
+            self._settle()
 
-            if self._section_has_loaded():
+            if self._wait_for_section_loaded(deadline):
                 return True
 
         log_progress(f"No se pudo abrir la sección de datos para {numero_registro}", "WARNING")
         return False
 
+    def _wait_for_section_loaded(self, deadline: float) -> bool:
+        while True:
+            if self._section_has_loaded():
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(0.1, remaining))
+
     def _section_has_loaded(self) -> bool:
         assert self.driver
         keywords = ["aptitud", "presentaci", "insecticida", "herbicida", "fungicida"]
@@ -614,13 +772,14 @@ class SenasaScraper:
                 aria_disabled = (element.get_attribute("aria-disabled") or "").lower()
                 if "disabled" in classes or aria_disabled == "true":
                     continue
+                first_before = self._first_listed_registro()
                 try:
                     element.click()
                 except Exception:
                     self.driver.execute_script("arguments[0].click();", element)
-                time.sleep(self.click_delay)
+                self._settle()
                 self._wait_for_table()
-                return True
+                return self._wait_for_page_change(first_before)
 
         log_progress("No se detectaron más páginas para navegar", "INFO")
         return False
@@ -645,16 +804,46 @@ class SenasaScraper:
             for element in elements:
                 if not element.is_displayed() or not element.is_enabled():
                     continue
+                first_before = self._first_listed_registro()
                 try:
                     element.click()
                 except Exception:
                     self.driver.execute_script("arguments[0].click();", element)
-                time.sleep(self.click_delay)
+                self._settle()
                 self._wait_for_table()
-                return True
+                return self._wait_for_page_change(first_before)
 
         return False
 
+    def _first_listed_registro(self) -> Optional[str]:
+        assert self.driver
+        try:
+            cells = self.driver.find_elements(By.CSS_SELECTOR, "table tbody tr td:first-child")
+            return normalize_registro(cells[0].text) if cells else None
+        except WebDriverException:
+            # La tabla se está redibujando justo en este momento.
+            return None
+
+    def _wait_for_page_change(self, first_before: Optional[str]) -> bool:
+        """Espera a que la tabla muestre otras filas tras un click de paginación.
+
+        ``_settle`` puede volver con el primer cambio del DOM (un spinner) y la
+        tabla anterior sigue cumpliendo ``_wait_for_table``; leerla de nuevo y
+        luego avanzar saltearía una página entera.
+        """
+        assert self.wait
+
+        def changed(_driver: Any) -> bool:
+            first_now = self._first_listed_registro()
+            return first_now is not None and first_now != first_before
+
+        try:
+            self.wait.until(changed)
+        except TimeoutException:
+            log_progress("La tabla no cambió tras el click de paginación", "WARNING")
+            return False
+        return True
+
 
 # ------------------------------------------------------------------------- #
 # CLI
@@ -716,27 +905,206 @@ def parse_arguments() -> argparse.Namespace:
         default=180,
         help="Timeout (segundos) para comandos enviados al navegador.",
     )
+    parser.add_argument(
+        "--driver",
+        choices=DRIVER_BACKENDS,
+        default="selenium",
+        help="Backend para controlar Chrome: selenium (chromedriver) o cdp (DevTools directo).",
+    )
+    parser.add_argument(
+        "--chrome-binary",
+        default=None,
+        help="Ruta al ejecutable de Chrome para el backend cdp (por defecto se autodetecta).",
+    )
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=None,
+        help="Base SQLite de catalog_index.py a actualizar con los productos nuevos.",
+    )
+    parser.add_argument(
+        "--duplicates-report",
+        type=Path,
+        default=None,
+        help="CSV donde reportar productos nuevos que probablemente dupliquen a uno existente.",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Mantiene el navegador abierto y revisa el listado periódicamente en busca de productos nuevos.",
+    )
+    parser.add_argument(
+        "--watch-interval",
+        type=float,
+        default=300,
+        help="Segundos entre revisiones en modo --watch (por defecto: %(default)s).",
+    )
+    parser.add_argument(
+        "--watch-pages",
+        type=int,
+        default=2,
+        help="Páginas del listado a revisar en cada ciclo de --watch (por defecto: %(default)s).",
+    )
+    parser.add_argument(
+        "--watch-deep-pages",
+        type=int,
+        default=None,
+        help="Páginas a recorrer cuando una revisión encuentra productos nuevos (por defecto: todas).",
+    )
+    parser.add_argument(
+        "--change-feed",
+        type=Path,
+        default=Path(DEFAULT_CHANGE_FEED),
+        help="Feed JSONL de sólo agregado con los productos nuevos en modo --watch (por defecto: %(default)s).",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="DIR",
+        help="Directorio donde guardar el perfil de la corrida (muestras, latencia de comandos y traza).",
+    )
+    parser.add_argument(
+        "--profile-interval",
+        type=float,
+        default=0.01,
+        help="Segundos entre muestras del perfilador (por defecto: %(default)s).",
+    )
     return parser.parse_args()
 
 
-def main() -> None:
-    args = parse_arguments()
+def report_duplicates(
+    path: Path,
+    existing_files: Sequence[Path],
+    records: Sequence[ProductRecord],
+    append: bool = False,
+) -> None:
+    from catalog_match import CatalogMatcher, load_catalog, write_report
+
+    matcher = CatalogMatcher(load_catalog(existing_files))
+    matches = matcher.match(record.as_dict() for record in records)
+    write_report(path, matches, append=append)
+    log_progress(
+        f"Posibles duplicados por marca/activos: {len(matches)} (ver {path})",
+        "WARNING" if matches else "INFO",
+    )
+
+
+def update_index(index_path: Path, csv_path: Path) -> None:
+    from catalog_index import CatalogIndex
+
+    with CatalogIndex(index_path) as index:
+        index.index_file(csv_path)
+    log_progress(f"Índice de búsqueda actualizado en {index_path}", "SUCCESS")
+
 
+def watch(
+    scraper: SenasaScraper,
+    args: argparse.Namespace,
+    known_registros: Set[str],
+) -> None:
+    """Revisa el listado cada ``--watch-interval`` segundos con el navegador ya abierto.
+
+    Cada ciclo recorre sólo ``--watch-pages`` páginas; si aparecen productos
+    nuevos se hace en el mismo ciclo un recorrido más profundo, porque el
+    alta de varios registros puede desplazar otros a páginas siguientes.
+    Cada producto se agrega al CSV de salida y al feed apenas se extrae. Si
+    el navegador falla se descarta y se abre uno nuevo en el ciclo siguiente.
+    """
+    feed = ChangeFeed(args.change_feed)
     existing_files = [args.existing_csv]
-    if args.output != args.existing_csv and args.output.exists():
+    if args.output != args.existing_csv:
         existing_files.append(args.output)
 
-    known_registros = load_known_registros(existing_files)
-    log_progress(f"Productos ya registrados: {len(known_registros)}", "INFO")
+    log_progress(
+        f"Modo vigilancia: {args.watch_pages} páginas cada {args.watch_interval:.0f} s; feed en {args.change_feed}",
+        "INFO",
+    )
+
+    cycle = 0
+    try:
+        while True:
+            cycle += 1
+            cycle_start = time.monotonic()
+            cycle_products: List[ProductRecord] = []
+
+            def publish(origen: str) -> Callable[[ProductRecord], None]:
+                def on_product(record: ProductRecord) -> None:
+                    write_csv(args.output, [record], append=True)
+                    feed.publish(record, origen)
+                    cycle_products.append(record)
+                    log_progress(f"Nuevo producto {record.numero_registro} publicado (seq {feed.seq})", "SUCCESS")
+
+                return on_product
 
-    with SenasaScraper(
+            try:
+                if scraper.driver is None:
+                    scraper.start()
+                scraper.scrape(known_registros, max_pages=args.watch_pages, on_product=publish("sondeo"))
+                if cycle_products:
+                    depth = f"{args.watch_deep_pages} páginas" if args.watch_deep_pages else "todo el listado"
+                    log_progress(f"Se detectaron productos nuevos; recorriendo {depth}", "PROGRESS")
+                    scraper.scrape(known_registros, max_pages=args.watch_deep_pages, on_product=publish("profundo"))
+            except Exception as exc:
+                log_progress(f"Falló el ciclo {cycle}: {exc}. Se reiniciará el navegador.", "ERROR")
+                scraper.stop()
+
+            elapsed = time.monotonic() - cycle_start
+            log_progress(f"Ciclo {cycle}: {len(cycle_products)} productos nuevos en {elapsed:.1f} s", "INFO")
+            if scraper.profiler:
+                # Resúmenes al día y una traza por ciclo: el perfil no crece sin límite.
+                scraper.profiler.checkpoint(rotate=True)
+
+            if cycle_products:
+                # El reporte acumula los ciclos; una falla acá no corta la vigilancia.
+                try:
+                    if args.duplicates_report:
+                        report_duplicates(args.duplicates_report, existing_files, cycle_products, append=True)
+                    if args.index:
+                        update_index(args.index, args.output)
+                except Exception as exc:
+                    log_progress(f"Falló el reporte o el índice del ciclo {cycle}: {exc}", "ERROR")
+
+            time.sleep(max(0.0, args.watch_interval - (time.monotonic() - cycle_start)))
+    except KeyboardInterrupt:
+        log_progress("Vigilancia detenida por el usuario", "INFO")
+    finally:
+        scraper.stop()
+
+
+def log_profile_summary(profiler: "ScrapeProfiler") -> None:
+    log_progress(f"Perfil guardado en {profiler.directory}", "SUCCESS")
+    log_progress("Comandos del navegador con más tiempo acumulado:", "INFO")
+    for method, command, count, seconds in profiler.command_totals(5):
+        log_progress(f"  {method} / {command}: {count} llamadas, {seconds:.1f} s", "INFO")
+    log_progress("Funciones con más muestras propias:", "INFO")
+    for label, fraction in profiler.top_functions(5):
+        log_progress(f"  {label}: {fraction:.0%}", "INFO")
+
+
+def run(
+    args: argparse.Namespace,
+    existing_files: Sequence[Path],
+    known_registros: Set[str],
+    profiler: Optional["ScrapeProfiler"],
+) -> None:
+    scraper = SenasaScraper(
         headless=args.headless,
         wait_timeout=args.wait_timeout,
         click_delay=args.click_delay,
         retry_attempts=args.retry_attempts,
         page_load_timeout=args.page_load_timeout,
         command_timeout=args.command_timeout,
-    ) as scraper:
+        backend=args.driver,
+        chrome_binary=args.chrome_binary,
+        profiler=profiler,
+    )
+
+    if args.watch:
+        watch(scraper, args, known_registros)
+        return
+
+    with scraper:
         start_time = time.time()
         new_products = scraper.scrape(known_registros, max_pages=args.max_pages)
         elapsed = time.time() - start_time
@@ -753,6 +1121,37 @@ def main() -> None:
     write_csv(args.output, new_products)
     log_progress(f"Productos nuevos guardados en {args.output}", "SUCCESS")
 
+    if args.duplicates_report:
+        report_duplicates(args.duplicates_report, existing_files, new_products)
+
+    if args.index:
+        update_index(args.index, args.output)
+
+
+def main() -> None:
+    args = parse_arguments()
+
+    existing_files = [args.existing_csv]
+    if args.output != args.existing_csv and args.output.exists():
+        existing_files.append(args.output)
+
+    known_registros = load_known_registros(existing_files)
+    log_progress(f"Productos ya registrados: {len(known_registros)}", "INFO")
+
+    profiler = None
+    if args.profile:
+        from scrape_profiler import ScrapeProfiler
+
+        profiler = ScrapeProfiler(args.profile, owner=SenasaScraper, sample_interval=args.profile_interval)
+        profiler.start()
+
+    try:
+        run(args, existing_files, known_registros, profiler)
+    finally:
+        if profiler:
+            profiler.stop()
+            log_profile_summary(profiler)
+
 
 if __name__ == "__main__":
     main()